@@ -1,5 +1,4 @@
 import streamlit as st
-import tempfile
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import librosa
@@ -14,19 +13,27 @@ from audio_processing.librosa_utils import (
     cargar_audio_desde_bytes,
     calcular_duracion,
     #graficar_espectrograma_librosa,
-    calcular_zcr,
 )
 
 from audio_processing.praat_utils import (
-    cargar_sonido_praat,
+    cargar_sonido_praat_desde_array,
     #graficar_espectrograma_praat,
-    obtener_frecuencia_fundamental,
     calcular_jitter_shimmer,
 )
+from audio_processing.ingesta import FORMATOS_ADMITIDOS
 from audio_processing.yamnet_filter import (
+    cargar_yamnet_model,
+    ejecutar_yamnet_desde_bytes,
+    embeddings_a_bytes,
     filtrar_llanto_yamnet,
 )
 
+from audio_processing.progresivo import (
+    PANELES,
+    RefinamientoProgresivo,
+    decimar,
+)
+
 from audio_processing.cry_detection import (
     detectar_llanto,
     detectar_segmentos_llanto,
@@ -36,12 +43,95 @@ from utils.energia import graficar_energia
 from utils.tiempo import detectar_tiempos_llanto
 
 from utils.visualizacion import (
-    graficar_espectrograma_praat_interactivo,
-    graficar_curva_f0,
-    graficar_zcr_plotly,
+    graficar_log_mel_yamnet,
 )
 #-----------------------------------------------------------------------------
 
+@st.cache_resource
+def obtener_modelo_yamnet():
+    return cargar_yamnet_model()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def obtener_salida_yamnet(audio_bytes, compuerta_energia):
+    # Una sola inferencia por archivo: la reutilizan el espectrograma log-mel,
+    # la detección de llanto (con cualquier umbral) y la descarga de embeddings.
+    # Se guarda la salida compacta (sin la señal ni las 521 clases) para no llenar la memoria
+    return ejecutar_yamnet_desde_bytes(audio_bytes, obtener_modelo_yamnet(), compuerta_energia)
+
+# Cuerpo de cada sección a partir del resultado de su función `*_completo` (ver progresivo.py)
+def dibujar_espectrograma_praat(resultado):
+    fig3, bytes_npz = resultado
+    st.plotly_chart(fig3, use_container_width=True)
+
+    # Botón de descarga
+    st.download_button(
+        label="⬇️ Descargar datos del espectrograma (.npz)",
+        data=bytes_npz,
+        file_name="espectrograma.npz",
+        mime="application/octet-stream"
+    )
+
+def dibujar_f0(resultado):
+    if resultado is None:
+        st.warning("No se pudo detectar la frecuencia fundamental.")
+        return
+
+    f0_min, f0_mean, f0_max, fig_f0, times_validos, f0_validos = resultado
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.write(f"🟢 **Mínima:** {f0_min:.2f} Hz")
+    with col2:
+        st.write(f"🟡 **Media:** {f0_mean:.2f} Hz")
+    with col3:
+        st.write(f"🔴 **Máxima:** {f0_max:.2f} Hz")
+
+    st.plotly_chart(fig_f0, use_container_width=True)
+
+    # Crear DataFrame solo con valores filtrados
+    df_f0 = pd.DataFrame({
+        'Tiempo (s)': times_validos,
+        'F0 (Hz)': f0_validos
+    })
+
+    # CSV en memoria para descarga
+    csv_buffer = io.StringIO()
+    df_f0.to_csv(csv_buffer, index=False)
+    csv_data = csv_buffer.getvalue()
+
+    # Escapar los caracteres especiales antes de usar en f-string
+    csv_data_encoded = csv_data.replace('\n', '%0A').replace(',', '%2C')
+
+    # Botón de descarga alineado a la derecha
+    st.markdown(
+        f"""
+        <div style="display: flex; justify-content: flex-end; margin-top: 10px;">
+            <a href="data:text/csv;charset=utf-8,{csv_data_encoded}" download="f0_datos.csv">
+                <button style="background-color: #4CAF50; color: white; border: none; padding: 8px 16px; border-radius: 5px; cursor: pointer;">
+                    📥 Descargar F0 (CSV)
+                </button>
+            </a>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def dibujar_zcr(resultado):
+    zcr_mean, fig_zcr = resultado
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"🔄 ZCR media: {zcr_mean:.4f}")
+    with col2:
+        if zcr_mean < 0.02:
+            st.markdown("<span style='color:blue'>🟢 Bajo ZCR</span>", unsafe_allow_html=True)
+        elif zcr_mean < 0.05:
+            st.markdown("<span style='color:orange'>🟡 Moderado ZCR</span>", unsafe_allow_html=True)
+        else:
+            st.markdown("<span style='color:red'>🔴 Alto ZCR</span>", unsafe_allow_html=True)
+    st.plotly_chart(fig_zcr, use_container_width=True)
+
+def dibujar_figura(fig):
+    st.plotly_chart(fig, use_container_width=True)
+
 st.set_page_config(page_title="Análisis de Llanto Infantil", layout="wide")
 
 # -----------------------------Menú lateral ---------------------------------
@@ -54,10 +144,24 @@ mostrar_f0 = st.sidebar.checkbox("📈 Frecuencia Fundamental", value=mostrar_to
 mostrar_jitter_shimmer = st.sidebar.checkbox("📉 Jitter y Shimmer", value=mostrar_todos, disabled=mostrar_todos)
 mostrar_zcr = st.sidebar.checkbox("📊 Zero-Crossing Rate", value=mostrar_todos, disabled=mostrar_todos)
 mostrar_llanto = st.sidebar.checkbox("🎚️ Filtrado con YAMNet", value=mostrar_todos, disabled=mostrar_todos)
+compuerta_energia = st.sidebar.checkbox(
+    "⚡ YAMNet: omitir silencios",
+    help="YAMNet se ejecuta solo sobre las zonas cuya energía supera un umbral; "
+         "acelera grabaciones largas con mucho silencio."
+)
+modo_progresivo = st.sidebar.checkbox(
+    "⚡ Vista previa progresiva",
+    help="Muestra primero una versión rápida de baja resolución de cada gráfica "
+         "y la reemplaza por la de resolución completa cuando termina de calcularse."
+)
+
+# Un cambio de archivo u opción relanza el script: se cancela el refinamiento anterior
+if "refinamiento" in st.session_state:
+    st.session_state.pop("refinamiento").cancelar()
 
 st.title("👶 Análisis de Llanto Infantil")
-# Cargar el archivo .wav
-archivo_audio = st.file_uploader("", type=["wav"])
+# Cargar el archivo (.wav, .flac u .ogg)
+archivo_audio = st.file_uploader("", type=FORMATOS_ADMITIDOS)
 
 if archivo_audio is not None:
     audio_bytes = archivo_audio.read()
@@ -65,7 +169,52 @@ if archivo_audio is not None:
     duracion = calcular_duracion(y, sr)
 
     # Mostrar reproductor siempre
-    st.audio(archivo_audio, format="audio/wav")
+    st.audio(archivo_audio, format=archivo_audio.type or "audio/wav")
+
+    refinamiento = None
+    marcadores, renderizadores = {}, {}
+
+    def mostrar_panel(panel, dibujar):
+        """
+        Sin vista previa calcula el panel y lo dibuja con `dibujar`. Con vista
+        previa dibuja la versión gruesa en un marcador dentro de la sección y
+        encola el cálculo completo, que `dibujar` muestra en el mismo lugar.
+        """
+        _, previa, completo = PANELES[panel]
+        if not modo_progresivo:
+            dibujar(completo(y, sr))
+            return
+
+        marcadores[panel] = st.empty()
+        fig_previa = previa(y_previa, sr_previa, y, sr)
+        if fig_previa is not None:
+            marcadores[panel].plotly_chart(fig_previa, use_container_width=True)
+        else:
+            marcadores[panel].info("Sin datos en la vista previa.")
+
+        # Resolución completa en segundo plano mientras se dibujan las demás secciones
+        if refinamiento is not None:
+            renderizadores[panel] = dibujar
+            refinamiento.enviar(panel, completo, y, sr)
+
+    if modo_progresivo:
+        st.markdown(
+            "<h4 style='text-align: center;'>⚡ Vista previa</h4>",
+            unsafe_allow_html=True
+        )
+        detener = st.button("⏹️ Detener refinamiento")
+        estado_refinamiento = st.empty()
+
+        # Pasada gruesa sobre la señal decimada
+        y_previa, sr_previa = decimar(y, sr)
+        if detener:
+            estado_refinamiento.caption("⏹️ Refinamiento detenido: se muestra la vista previa.")
+        else:
+            refinamiento = RefinamientoProgresivo()
+            st.session_state["refinamiento"] = refinamiento
+
+        st.markdown(f"**{PANELES['energia'][0]}**")
+        mostrar_panel("energia", dibujar_figura)
 
     if mostrar_info_general:
         st.markdown(
@@ -107,27 +256,17 @@ if archivo_audio is not None:
                  \n- **Y**: Frecuencia (Hz) - Muestra la frecuencia correspondiente a la posición vertical del cursor.
                  \n- **Z**: Intensidad (dB) - Representa la energía o amplitud de la señal en ese punto, expresada en decibeles.
                  \nEstos valores permiten analizar con precisión las características acústicas del llanto en cada instante del tiempo.
+                 \nLa vista **Log-mel YAMNet** muestra el espectrograma de 64 bandas mel (125–7500 Hz) que YAMNet calcula
+                 para detectar el llanto; es más rápida si el filtrado con YAMNet ya se ejecutó.
                 """)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_path = tmp_file.name
-        snd = cargar_sonido_praat(tmp_path)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".npz") as tmp_file:
-            ruta_npz = tmp_file.name
-        fig3 = graficar_espectrograma_praat_interactivo(snd, max_freq=5000, guardar_como=ruta_npz)
-        st.plotly_chart(fig3, use_container_width=True)
-        # Leer el contenido del archivo para la descarga
-        with open(ruta_npz, "rb") as f:
-            bytes_npz = f.read()
-
-        # Botón de descarga
-        st.download_button(
-            label="⬇️ Descargar datos del espectrograma (.npz)",
-            data=bytes_npz,
-            file_name="espectrograma.npz",
-            mime="application/octet-stream"
-        )
+        vista_espectrograma = st.radio("Vista", ["Praat", "Log-mel YAMNet"], horizontal=True)
+
+        if vista_espectrograma == "Log-mel YAMNet":
+            with st.spinner("🔎 Calculando log-mel con YAMNet..."):
+                salida_yamnet = obtener_salida_yamnet(audio_bytes, compuerta_energia)
+            st.plotly_chart(graficar_log_mel_yamnet(salida_yamnet["log_mel"]), use_container_width=True)
+        else:
+            mostrar_panel("espectrograma", dibujar_espectrograma_praat)
     
     if mostrar_f0:
         st.markdown(
@@ -154,56 +293,7 @@ if archivo_audio is not None:
                 \n\tPueden mostrar F0 muy elevadas (> 800 Hz) o patrones inusuales
                 """)
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                tmp_file.write(audio_bytes)
-                tmp_path = tmp_file.name
-            
-            snd = cargar_sonido_praat(tmp_path)
-            f0_mean, f0_min, f0_max, (f0_times, f0_curve) = obtener_frecuencia_fundamental(snd)
-            if f0_mean is not None:
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.write(f"🟢 **Mínima:** {f0_min:.2f} Hz")
-                with col2:
-                    st.write(f"🟡 **Media:** {f0_mean:.2f} Hz")
-                with col3:
-                    st.write(f"🔴 **Máxima:** {f0_max:.2f} Hz")
-
-                # Usar la función actualizada que retorna también los valores válidos
-                fig_f0, times_validos, f0_validos = graficar_curva_f0(f0_times, f0_curve)
-                print(type(fig_f0))
-
-                st.plotly_chart(fig_f0, use_container_width=True)
-
-                # Crear DataFrame solo con valores filtrados
-                df_f0 = pd.DataFrame({
-                    'Tiempo (s)': times_validos,
-                    'F0 (Hz)': f0_validos
-                })
-
-                # CSV en memoria para descarga
-                csv_buffer = io.StringIO()
-                df_f0.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-
-                # Escapar los caracteres especiales antes de usar en f-string
-                csv_data_encoded = csv_data.replace('\n', '%0A').replace(',', '%2C')
-
-                # Botón de descarga alineado a la derecha
-                st.markdown(
-                    f"""
-                    <div style="display: flex; justify-content: flex-end; margin-top: 10px;">
-                        <a href="data:text/csv;charset=utf-8,{csv_data_encoded}" download="f0_datos.csv">
-                            <button style="background-color: #4CAF50; color: white; border: none; padding: 8px 16px; border-radius: 5px; cursor: pointer;">
-                                📥 Descargar F0 (CSV)
-                            </button>
-                        </a>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            else:
-                st.warning("No se pudo detectar la frecuencia fundamental.")
+            mostrar_panel("f0", dibujar_f0)
         except Exception as e:
             st.error(f"⚠️ Error: {e}")
 
@@ -228,10 +318,7 @@ if archivo_audio is not None:
                 o afectaciones en el sistema respiratorio o laríngeo del bebé. 
                 """)
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                tmp_file.write(audio_bytes)
-                tmp_path = tmp_file.name
-            snd = cargar_sonido_praat(tmp_path)
+            snd = cargar_sonido_praat_desde_array(y, sr)
             jitter, shimmer = calcular_jitter_shimmer(snd)
             jitter_percent = jitter * 100
             shimmer_percent = shimmer * 100
@@ -261,20 +348,7 @@ if archivo_audio is not None:
                 angustia, esfuerzo respiratorio o llanto agudo. En cambio, un ZCR bajo sugiere llantos más tonales
                 y estables, a menudo asociados con estados menos críticos.
                 """)
-        zcr = calcular_zcr(y)
-        zcr_mean = np.mean(zcr)
-        col1, col2 = st.columns(2)
-        with col1:
-            st.write(f"🔄 ZCR media: {zcr_mean:.4f}")
-        with col2:
-            if zcr_mean < 0.02:
-                st.markdown("<span style='color:blue'>🟢 Bajo ZCR</span>", unsafe_allow_html=True)
-            elif zcr_mean < 0.05:
-                st.markdown("<span style='color:orange'>🟡 Moderado ZCR</span>", unsafe_allow_html=True)
-            else:
-                st.markdown("<span style='color:red'>🔴 Alto ZCR</span>", unsafe_allow_html=True)
-        fig_zcr = graficar_zcr_plotly(y, sr)
-        st.plotly_chart(fig_zcr, use_container_width=True)
+        mostrar_panel("zcr", dibujar_zcr)
         
     if mostrar_llanto:
         st.markdown(
@@ -285,7 +359,12 @@ if archivo_audio is not None:
         threshold = st.slider("🎚️ Umbral de detección (confianza mínima)", 0.0, 1.0, 0.3, 0.05)
 
         with st.spinner("🔎 Analizando llanto con YAMNet..."):
-            resultado = filtrar_llanto_yamnet(audio_bytes, threshold=threshold)
+            salida_yamnet = obtener_salida_yamnet(audio_bytes, compuerta_energia)
+            resultado = filtrar_llanto_yamnet(audio_bytes, threshold=threshold, salida=salida_yamnet)
+
+        if compuerta_energia:
+            st.caption(f"⚡ Inferencia omitida en silencios: "
+                       f"{salida_yamnet['estadisticas']['fraccion_omitida']:.0%} de los frames.")
 
         if resultado is not None:
             audio_filtrado_bytes, sr_filtrado, segmentos = resultado
@@ -310,7 +389,33 @@ if archivo_audio is not None:
 
         else:
             st.warning("⚠️ No se detectaron segmentos de llanto con el umbral seleccionado.")
+
+        # Embeddings de 1024 dimensiones por frame (0.48 s), para búsquedas o clasificadores sin reinferir
+        st.download_button(
+            label="⬇️ Descargar embeddings YAMNet (.npy, float16)",
+            data=embeddings_a_bytes(salida_yamnet["embeddings"]),
+            file_name="embeddings_yamnet.npy",
+            mime="application/octet-stream"
+        )
+
+    if refinamiento is not None:
+        # Cada actualización del estado le permite a Streamlit interrumpir el
+        # script si el usuario cambia el archivo; el finally cancela lo pendiente
+        try:
+            while refinamiento.pendientes:
+                estado_refinamiento.caption(f"🔄 Refinando {len(refinamiento.pendientes)} panel(es)...")
+                for panel, resultado_panel, error in refinamiento.esperar():
+                    if error is not None:
+                        marcadores[panel].error(f"⚠️ Error: {error}")
+                    else:
+                        # La sección completa reemplaza a la vista previa en su marcador
+                        with marcadores[panel].container():
+                            renderizadores[panel](resultado_panel)
+            estado_refinamiento.caption("✅ Resolución completa.")
+        finally:
+            refinamiento.cancelar()
+            st.session_state.pop("refinamiento", None)
 else:
-    st.warning("Por favor, sube una muestra de llanto en formato .wav para comenzar.")
+    st.warning("Por favor, sube una muestra de llanto en formato .wav, .flac u .ogg para comenzar.")
 
     
\ No newline at end of file
@@ -0,0 +1,490 @@
+"""
+Cola de trabajos en SQLite para procesar el archivo de grabaciones con varios
+workers, en una o varias máquinas que compartan el sistema de archivos.
+
+Cada grabación es una fila de la tabla `trabajos`. Un worker reclama una fila
+con una concesión (lease) de duración limitada, la renueva mientras trabaja y
+guarda el resultado en la misma fila al terminar (checkpoint por archivo).
+Si un worker muere, su concesión caduca y otro worker retoma la grabación.
+Los fallos (incluidas las concesiones caducadas) se reintentan con espera
+exponencial hasta `max_intentos`.
+
+La base usa el journal por defecto (no WAL), que es el modo que SQLite
+soporta sobre sistemas de archivos de red.
+
+Uso (desde la raíz del repositorio):
+    python -m audio_processing.cola_trabajos encolar archivo.db data/
+    python -m audio_processing.cola_trabajos trabajar archivo.db --procesos 4
+    python -m audio_processing.cola_trabajos estado archivo.db
+    python -m audio_processing.cola_trabajos reintentar archivo.db
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+import numpy as np
+
+EXTENSIONES_AUDIO = (".wav", ".flac", ".ogg")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY,
+    ruta TEXT NOT NULL UNIQUE,
+    estado TEXT NOT NULL DEFAULT 'pendiente',  -- pendiente | en_proceso | completado | fallido
+    intentos INTEGER NOT NULL DEFAULT 0,
+    disponible_desde REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_hasta REAL,
+    iniciado_en REAL,
+    terminado_en REAL,
+    duracion_s REAL,
+    resultado TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, disponible_desde);
+"""
+
+
+def conectar(ruta_db, timeout=60.0):
+    # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+    con = sqlite3.connect(ruta_db, timeout=timeout, isolation_level=None)
+    con.row_factory = sqlite3.Row
+    con.executescript(ESQUEMA)
+    return con
+
+
+def encolar(ruta_db, rutas):
+    """Añade las grabaciones (archivos o carpetas) a la cola. Las ya encoladas se ignoran."""
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, nombres in os.walk(ruta):
+                archivos += [os.path.join(raiz, n) for n in nombres if n.lower().endswith(EXTENSIONES_AUDIO)]
+        else:
+            archivos.append(ruta)
+
+    con = conectar(ruta_db)
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        antes = con.total_changes
+        con.executemany("INSERT OR IGNORE INTO trabajos (ruta) VALUES (?)",
+                        [(os.path.abspath(a),) for a in sorted(archivos)])
+        nuevos = con.total_changes - antes
+        con.execute("COMMIT")
+    finally:
+        con.close()
+    return nuevos
+
+
+def _espera_reintento(intentos, espera_base_s, espera_max_s):
+    # Espera exponencial con jitter para que los workers no reintenten a la vez
+    return min(espera_max_s, espera_base_s * 2 ** (intentos - 1)) * random.uniform(0.8, 1.2)
+
+
+def _recuperar_caducados(con, ahora, max_intentos, espera_base_s, espera_max_s, filtro_shard, params_shard):
+    """
+    Trata las concesiones caducadas (worker caído) como un intento fallido: si
+    se agotaron los intentos la fila queda fallida, si no vuelve a pendiente
+    con la misma espera exponencial que `fallar`. Evita que una grabación que
+    tumba al worker (p. ej. un fallo nativo al decodificarla) se reclame sin fin.
+    """
+    caducados = con.execute(f"""
+        SELECT id, intentos FROM trabajos
+        WHERE estado = 'en_proceso' AND lease_hasta < ? {filtro_shard}
+    """, [ahora] + params_shard).fetchall()
+    for fila in caducados:
+        error = "Concesión caducada: el worker se detuvo sin terminar"
+        if fila["intentos"] >= max_intentos:
+            con.execute("""
+                UPDATE trabajos SET estado = 'fallido', error = ?, terminado_en = ?, lease_hasta = NULL
+                WHERE id = ?
+            """, (error, ahora, fila["id"]))
+        else:
+            con.execute("""
+                UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_desde = ?, lease_hasta = NULL
+                WHERE id = ?
+            """, (error, ahora + _espera_reintento(fila["intentos"], espera_base_s, espera_max_s), fila["id"]))
+
+
+def reclamar(con, worker, lease_s, shard=None, max_intentos=3, espera_base_s=30.0, espera_max_s=3600.0):
+    """
+    Reclama atómicamente el siguiente trabajo pendiente cuya espera terminó.
+    Antes, las concesiones caducadas (worker caído) cuentan como intento
+    fallido y respetan `max_intentos` y la espera exponencial.
+    `shard=(i, n)` limita el worker a las filas con id % n == i.
+    """
+    ahora = time.time()
+    filtro_shard, params_shard = "", []
+    if shard is not None:
+        filtro_shard = "AND id % ? = ?"
+        params_shard = [shard[1], shard[0]]
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        _recuperar_caducados(con, ahora, max_intentos, espera_base_s, espera_max_s, filtro_shard, params_shard)
+        fila = con.execute(f"""
+            SELECT id, ruta, intentos FROM trabajos
+            WHERE estado = 'pendiente' AND disponible_desde <= ? {filtro_shard}
+            ORDER BY id LIMIT 1
+        """, [ahora] + params_shard).fetchone()
+        if fila is not None:
+            con.execute("""
+                UPDATE trabajos
+                SET estado = 'en_proceso', worker = ?, lease_hasta = ?, iniciado_en = ?, intentos = intentos + 1
+                WHERE id = ?
+            """, (worker, ahora + lease_s, ahora, fila["id"]))
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return fila
+
+
+def renovar(con, id_trabajo, worker, lease_s):
+    cur = con.execute("UPDATE trabajos SET lease_hasta = ? WHERE id = ? AND worker = ? AND estado = 'en_proceso'",
+                      (time.time() + lease_s, id_trabajo, worker))
+    return cur.rowcount == 1
+
+
+def completar(con, id_trabajo, worker, resultado):
+    ahora = time.time()
+    con.execute("""
+        UPDATE trabajos
+        SET estado = 'completado', resultado = ?, error = NULL, terminado_en = ?,
+            duracion_s = ? - iniciado_en, lease_hasta = NULL
+        WHERE id = ? AND worker = ?
+    """, (json.dumps(resultado), ahora, ahora, id_trabajo, worker))
+
+
+def fallar(con, id_trabajo, worker, error, max_intentos, espera_base_s=30.0, espera_max_s=3600.0):
+    """Programa un reintento con espera exponencial, o marca el trabajo como fallido."""
+    intentos = con.execute("SELECT intentos FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()["intentos"]
+    if intentos >= max_intentos:
+        con.execute("""
+            UPDATE trabajos SET estado = 'fallido', error = ?, terminado_en = ?, lease_hasta = NULL
+            WHERE id = ? AND worker = ?
+        """, (error, time.time(), id_trabajo, worker))
+    else:
+        espera = _espera_reintento(intentos, espera_base_s, espera_max_s)
+        con.execute("""
+            UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_desde = ?, lease_hasta = NULL
+            WHERE id = ? AND worker = ?
+        """, (error, time.time() + espera, id_trabajo, worker))
+
+
+def liberar(con, id_trabajo, worker):
+    """Devuelve un trabajo interrumpido a la cola sin contar el intento."""
+    con.execute("""
+        UPDATE trabajos SET estado = 'pendiente', intentos = MAX(intentos - 1, 0), lease_hasta = NULL
+        WHERE id = ? AND worker = ? AND estado = 'en_proceso'
+    """, (id_trabajo, worker))
+
+
+def reintentar_fallidos(ruta_db):
+    con = conectar(ruta_db)
+    try:
+        cur = con.execute("""
+            UPDATE trabajos SET estado = 'pendiente', intentos = 0, disponible_desde = 0, error = NULL
+            WHERE estado = 'fallido'
+        """)
+        return cur.rowcount
+    finally:
+        con.close()
+
+
+# ------------------------------ Análisis ---------------------------------------
+
+def analizar_grabacion(ruta, model=None, threshold=0.3, compuerta_energia=False, carpeta_embeddings=None):
+    """
+    Ejecuta el mismo análisis que app.py sobre una grabación y devuelve un
+    diccionario serializable en JSON. YAMNet solo se ejecuta si se pasa `model`;
+    con `carpeta_embeddings` sus embeddings se guardan como .npy en float16.
+    """
+    from audio_processing.ingesta import leer_audio_por_bloques
+    from audio_processing.librosa_utils import calcular_duracion, calcular_zcr
+    from audio_processing.praat_utils import (
+        cargar_sonido_praat_desde_array,
+        obtener_frecuencia_fundamental,
+        calcular_jitter_shimmer,
+    )
+
+    y, sr = leer_audio_por_bloques(ruta)
+    resultado = {
+        "duracion_s": float(calcular_duracion(y, sr)),
+        "sr": int(sr),
+        "n_muestras": int(len(y)),
+        "amplitud_max": float(np.max(np.abs(y))) if len(y) else 0.0,
+        "rms": float(np.sqrt(np.mean(np.square(y)))) if len(y) else 0.0,
+        "offset_dc": float(np.mean(y)) if len(y) else 0.0,
+        "zcr_media": float(np.mean(calcular_zcr(y))),
+    }
+
+    snd = cargar_sonido_praat_desde_array(y, sr)
+    f0_mean, f0_min, f0_max, _ = obtener_frecuencia_fundamental(snd)
+    resultado["f0"] = None if f0_mean is None else {
+        "media": float(f0_mean), "min": float(f0_min), "max": float(f0_max)}
+    jitter, shimmer = calcular_jitter_shimmer(snd)
+    resultado["jitter"] = float(jitter)
+    resultado["shimmer"] = float(shimmer)
+
+    if model is not None:
+        from audio_processing.yamnet_filter import ejecutar_yamnet, segmentos_desde_salida, guardar_embeddings
+
+        salida = ejecutar_yamnet(y, sr, model, compuerta_energia)
+        sr_y = salida["sr"]
+        segmentos = segmentos_desde_salida(salida, threshold)
+        resultado["segmentos_llanto_s"] = [(start / sr_y, end / sr_y) for start, end in segmentos]
+        if compuerta_energia:
+            resultado["yamnet_fraccion_omitida"] = salida["estadisticas"]["fraccion_omitida"]
+
+        if carpeta_embeddings is not None:
+            # Nombre único por ruta para que grabaciones homónimas no se pisen
+            nombre = os.path.splitext(os.path.basename(ruta))[0]
+            sufijo = hashlib.sha1(os.path.abspath(ruta).encode()).hexdigest()[:10]
+            destino = os.path.join(carpeta_embeddings, f"{nombre}_{sufijo}.npy")
+            os.makedirs(carpeta_embeddings, exist_ok=True)
+            resultado["embeddings"] = guardar_embeddings(destino, salida["embeddings"])
+
+    return resultado
+
+
+# ------------------------------- Workers ---------------------------------------
+
+class _Renovador(threading.Thread):
+    """Renueva la concesión del trabajo en curso mientras el análisis se ejecuta."""
+
+    def __init__(self, ruta_db, id_trabajo, worker, lease_s):
+        super().__init__(daemon=True)
+        self.ruta_db, self.id_trabajo, self.worker, self.lease_s = ruta_db, id_trabajo, worker, lease_s
+        self.detener = threading.Event()
+
+    def run(self):
+        con = conectar(self.ruta_db)
+        try:
+            while not self.detener.wait(self.lease_s / 3):
+                if not renovar(con, self.id_trabajo, self.worker, self.lease_s):
+                    break
+        finally:
+            con.close()
+
+
+def trabajar(ruta_db, yamnet=None, threshold=0.3, compuerta_energia=False, carpeta_embeddings=None, lease_s=600.0,
+             max_intentos=3, espera_base_s=30.0, shard=None, max_trabajos=None, espera_vacia_s=10.0):
+    """
+    Bucle de un worker: reclama, analiza y guarda grabaciones hasta vaciar la
+    cola. Si solo quedan trabajos en proceso de otros workers, espera por si
+    alguna concesión caduca. `yamnet`: None, 'hub' o ruta a un SavedModel local.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    model = None
+    if yamnet is not None:
+        from audio_processing.yamnet_filter import cargar_yamnet_model, YAMNET_HANDLE
+        model = cargar_yamnet_model(YAMNET_HANDLE if yamnet == "hub" else yamnet)
+
+    con = conectar(ruta_db)
+    procesados = 0
+    try:
+        while max_trabajos is None or procesados < max_trabajos:
+            fila = reclamar(con, worker, lease_s, shard, max_intentos, espera_base_s)
+            if fila is None:
+                # Solo cuentan los trabajos del propio shard: los de otros shards no le tocan
+                filtro_shard, params_shard = ("AND id % ? = ?", [shard[1], shard[0]]) if shard else ("", [])
+                quedan = con.execute(f"""
+                    SELECT COUNT(*) FROM trabajos WHERE estado IN ('pendiente', 'en_proceso') {filtro_shard}
+                """, params_shard).fetchone()[0]
+                if quedan == 0:
+                    break
+                time.sleep(espera_vacia_s)
+                continue
+
+            renovador = _Renovador(ruta_db, fila["id"], worker, lease_s)
+            renovador.start()
+            try:
+                resultado = analizar_grabacion(fila["ruta"], model, threshold, compuerta_energia, carpeta_embeddings)
+            except KeyboardInterrupt:
+                liberar(con, fila["id"], worker)
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                fallar(con, fila["id"], worker, f"{type(e).__name__}: {e}", max_intentos, espera_base_s)
+            else:
+                completar(con, fila["id"], worker, resultado)
+            finally:
+                renovador.detener.set()
+                renovador.join()
+            procesados += 1
+    finally:
+        con.close()
+
+    return procesados
+
+
+# ------------------------------- Reporte ---------------------------------------
+
+def estado(ruta_db, ventana_s=600.0):
+    """Resumen de avance: conteos por estado, throughput reciente y global, y ETA."""
+    con = conectar(ruta_db)
+    try:
+        ahora = time.time()
+        conteos = {fila["estado"]: fila["n"] for fila in
+                   con.execute("SELECT estado, COUNT(*) AS n FROM trabajos GROUP BY estado")}
+        total = sum(conteos.values())
+        completados = conteos.get("completado", 0)
+
+        recientes = con.execute("SELECT COUNT(*) FROM trabajos WHERE estado = 'completado' AND terminado_en >= ?",
+                                (ahora - ventana_s,)).fetchone()[0]
+        primero, ultimo, duracion_media = con.execute("""
+            SELECT MIN(iniciado_en), MAX(terminado_en), AVG(duracion_s) FROM trabajos WHERE estado = 'completado'
+        """).fetchone()
+        workers_activos = con.execute("""
+            SELECT COUNT(DISTINCT worker) FROM trabajos WHERE estado = 'en_proceso' AND lease_hasta >= ?
+        """, (ahora,)).fetchone()[0]
+    finally:
+        con.close()
+
+    # Si la ejecución lleva menos que `ventana_s`, dividir solo por el tiempo transcurrido
+    ventana_efectiva = min(ventana_s, ahora - primero) if primero is not None else ventana_s
+    throughput_reciente = recientes / ventana_efectiva if ventana_efectiva > 0 else 0.0
+    throughput_global = completados / (ultimo - primero) if completados and ultimo > primero else 0.0
+    restantes = conteos.get("pendiente", 0) + conteos.get("en_proceso", 0)
+    throughput = throughput_reciente or throughput_global
+
+    return {
+        "total": total,
+        "pendiente": conteos.get("pendiente", 0),
+        "en_proceso": conteos.get("en_proceso", 0),
+        "completado": completados,
+        "fallido": conteos.get("fallido", 0),
+        "avance": completados / total if total else 0.0,
+        "workers_activos": workers_activos,
+        "throughput_reciente_por_min": throughput_reciente * 60,
+        "throughput_global_por_min": throughput_global * 60,
+        "duracion_media_s": duracion_media,
+        "eta_s": restantes / throughput if throughput > 0 else None,
+    }
+
+
+def _imprimir_estado(e):
+    print(f"Total: {e['total']}  Completados: {e['completado']} ({e['avance']:.1%})  "
+          f"Pendientes: {e['pendiente']}  En proceso: {e['en_proceso']}  Fallidos: {e['fallido']}")
+    print(f"Workers activos: {e['workers_activos']}  "
+          f"Throughput: {e['throughput_reciente_por_min']:.1f}/min (reciente), "
+          f"{e['throughput_global_por_min']:.1f}/min (global)")
+    if e["duracion_media_s"] is not None:
+        print(f"Duración media por archivo: {e['duracion_media_s']:.1f} s")
+    if e["eta_s"] is not None:
+        print(f"Tiempo restante estimado: {e['eta_s'] / 3600:.2f} h")
+
+
+def _trabajar_proceso(contador, kwargs):
+    procesados = trabajar(**kwargs)
+    with contador.get_lock():
+        contador.value += procesados
+
+
+def trabajar_en_procesos(procesos, **kwargs):
+    """
+    Ejecuta `procesos` workers (`trabajar`) en procesos separados y vigila cada
+    uno por su cuenta. Si un proceso muere por una señal (fallo nativo al
+    decodificar, falta de memoria) se relanza solo ese; los demás siguen con su
+    trabajo. La grabación que tenía se retoma al caducar su concesión y cuenta
+    como intento, así que `max_intentos` acota los reintentos de un archivo que
+    tumba al worker. Un proceso que termina con una excepción de Python (error
+    de configuración, base inaccesible) no se relanza.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    contador = contexto.Value("q", 0)
+
+    def _lanzar():
+        proceso = contexto.Process(target=_trabajar_proceso, args=(contador, kwargs))
+        proceso.start()
+        return proceso
+
+    activos = [_lanzar() for _ in range(procesos)]
+    try:
+        while activos:
+            multiprocessing.connection.wait([p.sentinel for p in activos])
+            for proceso in [p for p in activos if not p.is_alive()]:
+                proceso.join()
+                activos.remove(proceso)
+                if proceso.exitcode < 0:
+                    print(f"El worker {proceso.pid} murió por la señal {-proceso.exitcode}; relanzándolo.")
+                    activos.append(_lanzar())
+                elif proceso.exitcode > 0:
+                    print(f"El worker {proceso.pid} terminó con error (código {proceso.exitcode}).")
+    finally:
+        # Ctrl+C también llega a los workers, que liberan su trabajo antes de salir
+        for proceso in activos:
+            proceso.join()
+
+    return contador.value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cola de trabajos en SQLite para el archivo de grabaciones.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("encolar", help="Añadir grabaciones a la cola.")
+    p.add_argument("db")
+    p.add_argument("rutas", nargs="+", help="Archivos o carpetas.")
+
+    p = sub.add_parser("trabajar", help="Procesar grabaciones de la cola.")
+    p.add_argument("db")
+    p.add_argument("--procesos", type=int, default=1, help="Workers en esta máquina.")
+    p.add_argument("--yamnet", default=None, help="'hub' o ruta a un SavedModel local (por defecto sin YAMNet).")
+    p.add_argument("--umbral", type=float, default=0.3, help="Umbral de confianza de YAMNet.")
+    p.add_argument("--compuerta-energia", action="store_true", help="Ejecutar YAMNet solo en zonas no silenciosas.")
+    p.add_argument("--embeddings", default=None,
+                   help="Carpeta donde guardar los embeddings de YAMNet (.npy float16 por grabación).")
+    p.add_argument("--lease", type=float, default=600.0, help="Duración de la concesión (s).")
+    p.add_argument("--max-intentos", type=int, default=3)
+    p.add_argument("--espera-base", type=float, default=30.0, help="Espera base (s) entre reintentos.")
+    p.add_argument("--shard", default=None, help="'i/n': procesar solo las filas con id %% n == i.")
+
+    p = sub.add_parser("estado", help="Mostrar avance y throughput.")
+    p.add_argument("db")
+    p.add_argument("--json", action="store_true", help="Imprimir en JSON.")
+
+    p = sub.add_parser("reintentar", help="Volver a encolar los trabajos fallidos.")
+    p.add_argument("db")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "encolar":
+        print(f"{encolar(args.db, args.rutas)} grabación(es) nuevas en la cola.")
+
+    elif args.comando == "trabajar":
+        shard = tuple(int(v) for v in args.shard.split("/")) if args.shard else None
+        kwargs = dict(ruta_db=args.db, yamnet=args.yamnet, threshold=args.umbral,
+                      compuerta_energia=args.compuerta_energia, carpeta_embeddings=args.embeddings,
+                      lease_s=args.lease,
+                      max_intentos=args.max_intentos, espera_base_s=args.espera_base, shard=shard)
+        if args.procesos == 1:
+            procesados = trabajar(**kwargs)
+        else:
+            procesados = trabajar_en_procesos(args.procesos, **kwargs)
+        print(f"{procesados} grabación(es) procesadas.")
+        _imprimir_estado(estado(args.db))
+
+    elif args.comando == "estado":
+        e = estado(args.db)
+        if args.json:
+            print(json.dumps(e, indent=2))
+        else:
+            _imprimir_estado(e)
+
+    elif args.comando == "reintentar":
+        print(f"{reintentar_fallidos(args.db)} trabajo(s) fallidos vueltos a encolar.")
+
+
+if __name__ == "__main__":
+    main()
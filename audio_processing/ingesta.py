@@ -0,0 +1,182 @@
+"""
+Ingesta de audio: decodificación por bloques de WAV/FLAC/OGG y transcodificación
+de WAV a FLAC (sin pérdida para PCM de 8, 16 y 24 bits).
+
+Uso (desde la raíz del repositorio), para convertir las grabaciones WAV que
+llegan antes de archivarlas; se conserva la estructura de carpetas y los
+archivos ya convertidos se omiten:
+    python -m audio_processing.ingesta data/entrantes/ --destino data/flac/
+"""
+import argparse
+import io
+import os
+import sys
+import warnings
+
+import numpy as np
+import soundfile as sf
+
+FORMATOS_ADMITIDOS = ["wav", "flac", "ogg"]
+TAM_BLOQUE = 65536
+
+# Subtipo de origen -> subtipo FLAC sin pérdida. FLAC no admite PCM sin signo: el PCM_U8
+# de los WAV de 8 bits se guarda como PCM_S8. El resto (PCM_32, float, etc.) se cuantiza
+# a 24 bits, el máximo de FLAC en libsndfile
+_SUBTIPOS_FLAC = {"PCM_S8": "PCM_S8", "PCM_U8": "PCM_S8", "PCM_16": "PCM_16", "PCM_24": "PCM_24"}
+
+
+def _abrir(fuente):
+    # `fuente` puede ser bytes, una ruta o un objeto tipo archivo
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        fuente = io.BytesIO(fuente)
+    return sf.SoundFile(fuente)
+
+
+def leer_audio_por_bloques(fuente, sr_objetivo=None, tam_bloque=TAM_BLOQUE):
+    """
+    Decodifica WAV/FLAC/OGG por bloques con soundfile directamente a un array
+    float32 mono (promedio de canales, como librosa.load). Si se indica
+    `sr_objetivo`, cada bloque se resamplea al vuelo con soxr, sin cargar
+    la señal completa a la tasa original.
+
+    Retorna:
+        y (float32), sr
+    """
+    with _abrir(fuente) as f:
+        sr = f.samplerate
+        remuestreo = None
+        n_salida = f.frames if f.frames > 0 else tam_bloque
+        if sr_objetivo and sr_objetivo != sr:
+            import soxr
+            remuestreo = soxr.ResampleStream(sr, sr_objetivo, 1, dtype="float32")
+            n_salida = int(np.ceil(n_salida * sr_objetivo / sr)) + 1
+            sr = sr_objetivo
+
+        y = np.empty(n_salida, dtype=np.float32)
+        bloque = np.empty((tam_bloque, f.channels), dtype=np.float32)
+        pos = 0
+
+        def _agregar(muestras):
+            nonlocal y, pos
+            if pos + len(muestras) > len(y):
+                y = np.resize(y, max(2 * len(y), pos + len(muestras)))
+            y[pos:pos + len(muestras)] = muestras
+            pos += len(muestras)
+
+        while True:
+            leidos = f.read(tam_bloque, dtype="float32", always_2d=True, out=bloque)
+            if len(leidos) == 0:
+                break
+            mono = leidos[:, 0] if f.channels == 1 else leidos.mean(axis=1)
+            if remuestreo is not None:
+                mono = remuestreo.resample_chunk(mono)
+            _agregar(mono)
+
+        if remuestreo is not None:
+            _agregar(remuestreo.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+
+    return y[:pos], sr
+
+
+def escribir_audio_por_bloques(y, sr, destino, formato="FLAC", subtipo=None, tam_bloque=TAM_BLOQUE):
+    """
+    Escribe una señal por bloques. Además de limitar la memoria intermedia,
+    evita el fallo de libsndfile al escribir OGG/Vorbis largos de una sola vez.
+    """
+    y = np.asarray(y)
+    canales = 1 if y.ndim == 1 else y.shape[1]
+    with sf.SoundFile(destino, "w", samplerate=sr, channels=canales, format=formato, subtype=subtipo) as salida:
+        for inicio in range(0, len(y), tam_bloque):
+            salida.write(y[inicio:inicio + tam_bloque])
+    return destino
+
+
+def transcodificar_a_flac(fuente, destino, tam_bloque=TAM_BLOQUE):
+    """
+    Convierte un audio (WAV u otro formato legible) a FLAC bloque a bloque.
+    El PCM de 8, 16 y 24 bits se conserva sin pérdida. Las fuentes PCM de 32
+    bits y en coma flotante se cuantizan a PCM de 24 bits (con un aviso), ya
+    que FLAC no admite más resolución. `destino` puede ser una ruta o un
+    objeto tipo archivo (p. ej. io.BytesIO).
+    """
+    with _abrir(fuente) as f:
+        subtipo = _SUBTIPOS_FLAC.get(f.subtype, "PCM_24")
+        if f.subtype not in _SUBTIPOS_FLAC:
+            nombre = fuente if isinstance(fuente, str) else "audio"
+            warnings.warn(f"{nombre}: el subtipo {f.subtype} se cuantiza a PCM_24 al convertir a FLAC (con pérdida)")
+            # libsndfile no escala float -> int al leer: las fuentes float se leen como float
+            dtype = "float64"
+        else:
+            dtype = "int16" if subtipo in ("PCM_S8", "PCM_16") else "int32"
+        with sf.SoundFile(destino, "w", samplerate=f.samplerate, channels=f.channels,
+                          format="FLAC", subtype=subtipo) as salida:
+            for bloque in f.blocks(blocksize=tam_bloque, dtype=dtype, always_2d=True):
+                salida.write(bloque)
+    return destino
+
+
+def transcodificar_wavs_a_flac(rutas, carpeta_destino, tam_bloque=TAM_BLOQUE):
+    """
+    Transcodifica a FLAC los WAV de `rutas` (archivos o carpetas) dentro de
+    `carpeta_destino`, conservando la estructura relativa de cada carpeta.
+    Los destinos que ya existen se omiten, así que se puede relanzar sobre
+    una carpeta de entrada que sigue creciendo. Un archivo que no se puede
+    convertir (WAV corrupto o truncado) se registra y se sigue con el resto.
+
+    Retorna:
+        convertidos: lista de (origen, destino)
+        fallidos: lista de (origen, error)
+    """
+    pares = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, nombres in os.walk(ruta):
+                pares += [(os.path.join(raiz, n), os.path.relpath(os.path.join(raiz, n), ruta))
+                          for n in nombres if n.lower().endswith(".wav")]
+        elif ruta.lower().endswith(".wav"):
+            pares.append((ruta, os.path.basename(ruta)))
+
+    convertidos, fallidos = [], []
+    for origen, relativa in sorted(pares):
+        destino = os.path.join(carpeta_destino, os.path.splitext(relativa)[0] + ".flac")
+        if os.path.exists(destino):
+            continue
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Escribir a un temporal y renombrar: una interrupción no deja un FLAC a medias
+        temporal = destino + ".parcial"
+        try:
+            with open(temporal, "wb") as salida:
+                transcodificar_a_flac(origen, salida, tam_bloque)
+        except Exception as e:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            error = f"{type(e).__name__}: {e}"
+            print(f"No se pudo convertir {origen}: {error}", file=sys.stderr)
+            fallidos.append((origen, error))
+            continue
+        os.replace(temporal, destino)
+        convertidos.append((origen, destino))
+    return convertidos, fallidos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Transcodifica grabaciones WAV a FLAC (sin pérdida salvo PCM_32 y float, que pasan a 24 bits).")
+    parser.add_argument("rutas", nargs="+", help="Archivos WAV o carpetas con WAV.")
+    parser.add_argument("--destino", required=True, help="Carpeta donde escribir los FLAC.")
+    args = parser.parse_args(argv)
+
+    convertidos, fallidos = transcodificar_wavs_a_flac(args.rutas, args.destino)
+    bytes_wav = sum(os.path.getsize(o) for o, _ in convertidos)
+    bytes_flac = sum(os.path.getsize(d) for _, d in convertidos)
+    print(f"{len(convertidos)} archivo(s) convertidos a FLAC"
+          + (f" ({bytes_flac / bytes_wav:.1%} del tamaño WAV)." if bytes_wav else "."))
+    if fallidos:
+        print(f"{len(fallidos)} archivo(s) no se pudieron convertir (detalle arriba):")
+        for origen, _ in fallidos:
+            print(f"  {origen}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,11 @@ import numpy as np
 import librosa
 import librosa.display
 import matplotlib.pyplot as plt
+from audio_processing.ingesta import leer_audio_por_bloques
 
 def cargar_audio_desde_bytes(audio_bytes, sr=None):
-    import io
-    return librosa.load(io.BytesIO(audio_bytes), sr=sr)
+    # WAV, FLAC u OGG decodificado por bloques; `sr` resamplea al vuelo
+    return leer_audio_por_bloques(audio_bytes, sr_objetivo=sr)
 
 def calcular_duracion(y, sr):
     return librosa.get_duration(y=y, sr=sr)
@@ -8,6 +8,10 @@ import matplotlib.pyplot as plt
 def cargar_sonido_praat(tmp_path):
     return parselmouth.Sound(tmp_path)
 
+def cargar_sonido_praat_desde_array(y, sr):
+    # Evita escribir un archivo temporal y admite cualquier formato ya decodificado
+    return parselmouth.Sound(np.asarray(y, dtype=np.float64), sampling_frequency=sr)
+
 def graficar_espectrograma_praat(snd, max_freq=5000):
     spectrogram = snd.to_spectrogram(window_length=0.025, maximum_frequency=max_freq)
     spectrogram_db = 10 * np.log10(np.maximum(spectrogram.values, 1e-10))
@@ -19,8 +23,9 @@ def graficar_espectrograma_praat(snd, max_freq=5000):
     plt.colorbar(im, ax=ax, format="%+2.0f dB")
     return fig
 
-def obtener_frecuencia_fundamental(snd):
-    pitch = snd.to_pitch()
+def obtener_frecuencia_fundamental(snd, time_step=None):
+    # time_step=None usa el paso por defecto de Praat; un paso mayor da una curva más dispersa y rápida
+    pitch = snd.to_pitch(time_step=time_step)
     f0_values = pitch.selected_array['frequency']
     f0_values = f0_values[f0_values != 0]  # Excluir silencios (F0 = 0)
 
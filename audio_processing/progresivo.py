@@ -0,0 +1,169 @@
+"""
+Análisis progresivo: primero una vista previa barata sobre la señal decimada
+y después, en segundo plano, el cálculo a resolución completa de cada panel.
+
+Las funciones `*_previa` devuelven una figura; las `*_completo` devuelven
+todos los datos que muestra la sección de app.py (figura, estadísticas y
+descargas), de modo que la sección es la misma con o sin vista previa.
+"""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import librosa
+
+from audio_processing.cry_detection import detectar_segmentos_llanto
+from audio_processing.librosa_utils import calcular_zcr
+from audio_processing.praat_utils import cargar_sonido_praat_desde_array, obtener_frecuencia_fundamental
+from utils.visualizacion import (
+    graficar_espectrograma_matriz,
+    graficar_espectrograma_praat_interactivo,
+    graficar_curva_f0,
+    graficar_segmentos_energia,
+    graficar_zcr_plotly,
+)
+
+SR_PREVIA = 11025     # suficiente para el espectrograma hasta 5 kHz y para F0
+FRAMES_PREVIA = 400   # columnas de tiempo aproximadas en las vistas previas
+PASO_F0_PREVIA = 0.05
+
+
+def decimar(y, sr, sr_previa=SR_PREVIA):
+    if sr <= sr_previa:
+        return y, sr
+    return librosa.resample(y, orig_sr=sr, target_sr=sr_previa, res_type="soxr_qq"), sr_previa
+
+
+def _hop_previa(n_muestras, minimo=512):
+    return max(minimo, n_muestras // FRAMES_PREVIA)
+
+
+def _titulo_previa(fig):
+    fig.update_layout(title=f"{fig.layout.title.text} (vista previa)")
+    return fig
+
+
+# ------------------------- Vistas previas (gruesas) ----------------------------
+
+def espectrograma_previa(y_previa, sr_previa, y, sr, max_freq=5000):
+    hop = _hop_previa(len(y_previa), minimo=128)
+    potencia = np.abs(librosa.stft(y_previa, n_fft=512, hop_length=hop)) ** 2
+    frecuencia = librosa.fft_frequencies(sr=sr_previa, n_fft=512)
+    mascara = frecuencia <= max_freq
+    spectrogram_db = 10 * np.log10(np.maximum(potencia[mascara], 1e-10))
+    tiempo = librosa.frames_to_time(np.arange(potencia.shape[1]), sr=sr_previa, hop_length=hop)
+    return graficar_espectrograma_matriz(spectrogram_db, tiempo, frecuencia[mascara],
+                                         titulo="Espectrograma (vista previa)")
+
+
+def f0_previa(y_previa, sr_previa, y, sr):
+    snd = cargar_sonido_praat_desde_array(y_previa, sr_previa)
+    f0_mean, _, _, (f0_times, f0_curve) = obtener_frecuencia_fundamental(snd, time_step=PASO_F0_PREVIA)
+    if f0_mean is None:
+        return None
+    fig, _, _ = graficar_curva_f0(f0_times, f0_curve)
+    return _titulo_previa(fig)
+
+
+def zcr_previa(y_previa, sr_previa, y, sr):
+    # El ZCR depende de la tasa de muestreo, así que se calcula sobre la señal
+    # original pero solo en frames espaciados
+    return _titulo_previa(graficar_zcr_plotly(y, sr, hop_length=_hop_previa(len(y))))
+
+
+def energia_previa(y_previa, sr_previa, y, sr):
+    hop = _hop_previa(len(y_previa))
+    segmentos = detectar_segmentos_llanto(y_previa, sr_previa, frame_length=2 * hop, hop_length=hop)
+    return _titulo_previa(graficar_segmentos_energia(y_previa, sr_previa, segmentos,
+                                                     frame_length=2 * hop, hop_length=hop))
+
+
+# ------------------------ Resolución completa ----------------------------------
+
+def espectrograma_completo(y, sr):
+    """Retorna la figura y los datos del espectrograma en .npz (bytes) para su descarga."""
+    buffer = io.BytesIO()
+    fig = graficar_espectrograma_praat_interactivo(cargar_sonido_praat_desde_array(y, sr), max_freq=5000,
+                                                   guardar_como=buffer)
+    return fig, buffer.getvalue()
+
+
+def f0_completo(y, sr):
+    """Retorna (f0_min, f0_media, f0_max, figura, tiempos, f0 válidos) o None si no hay F0."""
+    f0_mean, f0_min, f0_max, (f0_times, f0_curve) = obtener_frecuencia_fundamental(
+        cargar_sonido_praat_desde_array(y, sr))
+    if f0_mean is None:
+        return None
+    fig, times_validos, f0_validos = graficar_curva_f0(f0_times, f0_curve)
+    return f0_min, f0_mean, f0_max, fig, times_validos, f0_validos
+
+
+def zcr_completo(y, sr):
+    """Retorna la ZCR media y la figura."""
+    return float(np.mean(calcular_zcr(y))), graficar_zcr_plotly(y, sr)
+
+
+def energia_completo(y, sr):
+    segmentos = detectar_segmentos_llanto(y, sr)
+    return graficar_segmentos_energia(y, sr, segmentos)
+
+
+# panel -> (título, vista previa, resolución completa)
+PANELES = {
+    "espectrograma": ("🎛️ Espectrograma", espectrograma_previa, espectrograma_completo),
+    "f0": ("📈 Frecuencia Fundamental", f0_previa, f0_completo),
+    "zcr": ("📊 Tasa de Cruce por Cero", zcr_previa, zcr_completo),
+    "energia": ("🔋 Segmentos de energía", energia_previa, energia_completo),
+}
+
+
+class RefinamientoProgresivo:
+    """
+    Ejecuta en hilos de fondo el cálculo a resolución completa de cada panel.
+    `cancelar()` descarta los paneles que aún no empezaron y hace que los
+    resultados de los que están en curso se ignoren.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._cancelado = threading.Event()
+        self._futuros = {}
+
+    def enviar(self, panel, funcion, *args):
+        def _tarea():
+            if self._cancelado.is_set():
+                return None
+            return funcion(*args)
+        self._futuros[self._executor.submit(_tarea)] = panel
+
+    @property
+    def pendientes(self):
+        # Paneles cuyo resultado todavía no se entregó con `esperar`
+        return list(self._futuros.values())
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def esperar(self, timeout=0.25):
+        """
+        Espera hasta `timeout` segundos y devuelve los paneles que terminaron
+        como [(panel, resultado, error)]. Cada resultado se entrega una sola vez.
+        """
+        if self.cancelado:
+            return []
+        hechos, _ = wait(list(self._futuros), timeout=timeout, return_when=FIRST_COMPLETED)
+        terminados = []
+        for futuro in hechos:
+            panel = self._futuros.pop(futuro)
+            if futuro.cancelled():
+                continue
+            error = futuro.exception()
+            terminados.append((panel, None if error else futuro.result(), error))
+        return terminados
+
+    def cancelar(self):
+        self._cancelado.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._futuros.clear()
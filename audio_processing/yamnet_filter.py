@@ -1,23 +1,32 @@
-import tensorflow as tf
-import tensorflow_hub as hub
 import numpy as np
 import librosa
 import soundfile as sf
 import os
 import io
 
-def cargar_yamnet_model():
-    model = hub.load('https://tfhub.dev/google/yamnet/1')
+from audio_processing.cry_detection import detectar_llanto
+from audio_processing.ingesta import leer_audio_por_bloques
+
+YAMNET_HANDLE = 'https://tfhub.dev/google/yamnet/1'
+
+SR_YAMNET = 16000
+HOP_YAMNET = 7680            # 0.48 s entre frames de YAMNet
+MUESTRAS_MIN_YAMNET = 15600  # parche de 0.96 s + ventana STFT de 25 ms - salto de 10 ms
+
+def cargar_yamnet_model(handle=YAMNET_HANDLE):
+    # TensorFlow solo se importa al cargar el modelo real
+    import tensorflow_hub as hub
+
+    # `handle` puede ser la URL de TF Hub o la ruta a una copia local del SavedModel
+    model = hub.load(handle)
     return model
 
-def obtener_segmentos_llanto(audio, sr, model, threshold=0.3):
-    # Resamplear a 16kHz (requisito de YAMNet)
-    if sr != 16000:
-        audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
-        sr = 16000
+def obtener_indice_llanto(model=None):
+    # Un modelo sustituto puede indicar su propio índice sin consultar el mapa de clases
+    if getattr(model, 'indice_llanto', None) is not None:
+        return model.indice_llanto
 
-    # Ejecutar modelo YAMNet
-    scores, embeddings, spectrogram = model(audio)
+    import tensorflow as tf
     class_map_path = tf.keras.utils.get_file(
         'yamnet_class_map.csv',
         'https://raw.githubusercontent.com/tensorflow/models/master/research/audioset/yamnet/yamnet_class_map.csv'
@@ -26,23 +35,185 @@ def obtener_segmentos_llanto(audio, sr, model, threshold=0.3):
 
     # Índice de "Infant cry"
     #cry_index = class_names.index('Infant cry')
-    cry_index = next(i for i, name in enumerate(class_names) if 'cry' in name.lower())
+    return next(i for i, name in enumerate(class_names) if 'cry' in name.lower())
 
-    # Obtener etiquetas por frames (~0.96 segundos)
-    scores_np = scores.numpy()
-    cry_scores = scores_np[:, cry_index]
+def segmentos_desde_scores(cry_scores, n_muestras, sr, threshold=0.3):
     mask = cry_scores > threshold
 
-    # Calcular los intervalos (en muestras)
-    hop_size = int(0.96 * sr)
+    # Calcular los intervalos (en muestras): un frame cada 0.48 s que cubre un parche de 0.96 s
+    hop_size = int(HOP_YAMNET * sr / SR_YAMNET)
+    patch_size = int(MUESTRAS_MIN_YAMNET * sr / SR_YAMNET)
     segments = []
     for i, val in enumerate(mask):
         if val:
             start = i * hop_size
-            end = min((i + 1) * hop_size, len(audio))
-            segments.append((start, end))
+            end = min(start + patch_size, n_muestras)
+            if start >= end:
+                continue
+            # Los parches de frames consecutivos se solapan: unirlos en un solo segmento
+            if segments and start <= segments[-1][1]:
+                segments[-1] = (segments[-1][0], end)
+            else:
+                segments.append((start, end))
+
+    return segments
+
+def _n_frames_yamnet(n_muestras):
+    # YAMNet rellena la señal hasta completar el primer parche y los saltos siguientes
+    return 1 + int(np.ceil(max(0, n_muestras - MUESTRAS_MIN_YAMNET) / HOP_YAMNET))
+
+def seleccionar_ventanas_candidatas(audio, sr, umbral_energia=0.02, relleno=0.5):
+    """
+    Selecciona las zonas con energía RMS mayor a `umbral_energia` (según
+    `detectar_llanto`), ampliadas `relleno` segundos por cada lado.
+    Los intervalos (inicio, fin) en muestras quedan alineados con la rejilla de
+    frames de YAMNet (saltos de 0.48 s), así cada frame inferido en una ventana
+    coincide con el mismo frame de una inferencia sobre la señal completa.
+    """
+    # librosa.feature.rms usa por defecto frame_length=2048 y hop_length=512
+    frame_length, hop_length = 2048, 512
+    _, energia = detectar_llanto(audio, sr, umbral_energia)
+    activos = np.flatnonzero(energia > umbral_energia)
+    if len(activos) == 0:
+        return []
 
-    return segments, sr
+    # Agrupar frames activos consecutivos
+    cortes = np.flatnonzero(np.diff(activos) > 1)
+    primeros = activos[np.r_[0, cortes + 1]]
+    ultimos = activos[np.r_[cortes, len(activos) - 1]]
+
+    relleno_muestras = int(relleno * sr)
+    ventanas = []
+    for primero, ultimo in zip(primeros, ultimos):
+        inicio = max(0, primero * hop_length - frame_length // 2 - relleno_muestras)
+        fin = min(len(audio), ultimo * hop_length + frame_length // 2 + relleno_muestras)
+
+        # Ajustar a la rejilla de YAMNet: inicio en un salto y fin al cerrar un parche
+        inicio = (inicio // HOP_YAMNET) * HOP_YAMNET
+        n_frames = _n_frames_yamnet(fin - inicio)
+        fin = min(len(audio), inicio + (n_frames - 1) * HOP_YAMNET + MUESTRAS_MIN_YAMNET)
+
+        if ventanas and inicio <= ventanas[-1][1]:
+            ventanas[-1] = (ventanas[-1][0], max(ventanas[-1][1], fin))
+        else:
+            ventanas.append((inicio, fin))
+
+    return ventanas
+
+def _a_numpy(salida_modelo):
+    # El modelo real devuelve tensores; un sustituto puede devolver arrays de numpy
+    return [t.numpy() if hasattr(t, 'numpy') else np.asarray(t) for t in salida_modelo]
+
+def _n_frames_log_mel(n_frames):
+    # 96 frames de 10 ms en el primer parche y 48 más por cada salto de 0.48 s
+    return 96 + (n_frames - 1) * 48
+
+def ejecutar_yamnet(audio, sr, model, compuerta_energia=False, umbral_energia=0.02, relleno=0.5):
+    """
+    Ejecuta YAMNet y conserva todas sus salidas en la línea de tiempo de la señal
+    a 16 kHz. Con `compuerta_energia=True` solo se infieren las ventanas con
+    energía (ver `seleccionar_ventanas_candidatas`); en los frames omitidos los
+    scores y embeddings valen 0 y el log-mel queda en su mínimo, log(0.001).
+
+    Retorna un diccionario con:
+        audio, sr, n_muestras: señal a 16 kHz
+        scores: (frames, 521), un frame cada 0.48 s
+        cry_scores: (frames,), columna de llanto de `scores`
+        embeddings: (frames, 1024)
+        log_mel: (frames de 10 ms, 64)
+        estadisticas: frames_totales, frames_inferidos, fraccion_omitida
+    """
+    # Resamplear a 16kHz (requisito de YAMNet)
+    if sr != SR_YAMNET:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=SR_YAMNET)
+        sr = SR_YAMNET
+
+    if not compuerta_energia:
+        scores, embeddings, log_mel = _a_numpy(model(audio))
+        frames_totales = frames_inferidos = len(scores)
+    else:
+        frames_totales = _n_frames_yamnet(len(audio))
+        scores = embeddings = log_mel = None
+        frames_inferidos = 0
+
+        for inicio, fin in seleccionar_ventanas_candidatas(audio, sr, umbral_energia, relleno):
+            salida_ventana = _a_numpy(model(audio[inicio:fin]))
+            if scores is None:
+                scores = np.zeros((frames_totales, salida_ventana[0].shape[1]), dtype=np.float32)
+                embeddings = np.zeros((frames_totales, salida_ventana[1].shape[1]), dtype=np.float32)
+                log_mel = np.full((_n_frames_log_mel(frames_totales), salida_ventana[2].shape[1]),
+                                  np.log(0.001), dtype=np.float32)
+            frames_inferidos += len(salida_ventana[0])
+
+            # Colocar cada salida en su posición de la línea de tiempo original
+            primer_frame = inicio // HOP_YAMNET
+            primer_frame_mel = primer_frame * 48
+            for destino, valores, offset in ((scores, salida_ventana[0], primer_frame),
+                                             (embeddings, salida_ventana[1], primer_frame),
+                                             (log_mel, salida_ventana[2], primer_frame_mel)):
+                n = min(len(valores), len(destino) - offset)
+                destino[offset:offset + n] = valores[:n]
+
+        if scores is None:
+            # Todo es silencio: no se ejecutó el modelo
+            scores = np.zeros((frames_totales, 521), dtype=np.float32)
+            embeddings = np.zeros((frames_totales, 1024), dtype=np.float32)
+            log_mel = np.full((_n_frames_log_mel(frames_totales), 64), np.log(0.001), dtype=np.float32)
+
+    return {
+        "audio": audio,
+        "sr": sr,
+        "n_muestras": len(audio),
+        "scores": scores,
+        "cry_scores": scores[:, obtener_indice_llanto(model)],
+        "embeddings": embeddings,
+        "log_mel": log_mel,
+        "estadisticas": {
+            "frames_totales": frames_totales,
+            "frames_inferidos": frames_inferidos,
+            "fraccion_omitida": max(0.0, 1 - frames_inferidos / frames_totales),
+        },
+    }
+
+def salida_compacta(salida):
+    """
+    Versión reducida de la salida de `ejecutar_yamnet` para guardarla en caché:
+    sin la señal ni las 521 columnas de scores (solo la de llanto), con
+    embeddings y log-mel en float16. Basta para `segmentos_desde_salida`, el
+    espectrograma log-mel y la descarga de embeddings; `filtrar_llanto_yamnet`
+    vuelve a decodificar la señal si la necesita.
+    """
+    return {
+        "sr": salida["sr"],
+        "n_muestras": salida["n_muestras"],
+        "cry_scores": salida["cry_scores"],
+        "embeddings": np.asarray(salida["embeddings"], dtype=np.float16),
+        "log_mel": np.asarray(salida["log_mel"], dtype=np.float16),
+        "estadisticas": salida["estadisticas"],
+    }
+
+def ejecutar_yamnet_desde_bytes(audio_bytes, model, compuerta_energia=False):
+    """
+    Decodifica el audio directamente a 16 kHz, ejecuta YAMNet y devuelve la
+    salida compacta (ver `salida_compacta`). Es lo que app.py guarda en caché
+    por archivo y lo que mide la prueba de carga.
+    """
+    y, sr = leer_audio_por_bloques(audio_bytes, sr_objetivo=SR_YAMNET)
+    return salida_compacta(ejecutar_yamnet(y, sr, model, compuerta_energia))
+
+def segmentos_desde_salida(salida, threshold=0.3):
+    # Obtener etiquetas por frames (cada 0.48 s)
+    return segmentos_desde_scores(salida["cry_scores"], salida["n_muestras"], salida["sr"], threshold)
+
+def guardar_embeddings(ruta, embeddings):
+    """Guarda los embeddings de una grabación como .npy en float16 (2 KB por frame de 0.48 s)."""
+    np.save(ruta, np.asarray(embeddings, dtype=np.float16))
+    return ruta
+
+def embeddings_a_bytes(embeddings):
+    buffer = io.BytesIO()
+    guardar_embeddings(buffer, embeddings)
+    return buffer.getvalue()
 
 def extraer_segmentos(audio, segments):
     # Extraer y concatenar
@@ -59,26 +230,39 @@ def guardar_segmentos(llanto_segmentos, sr, carpeta_salida="segmentos_llanto"):
         archivos.append(path)
     return archivos
 
-def filtrar_llanto_yamnet(audio_bytes, threshold=0.3):
+def filtrar_llanto_yamnet(audio_bytes, threshold=0.3, model=None, compuerta_energia=False, salida=None):
     """
     Carga un audio en bytes, aplica YAMNet para detectar llanto infantil,
     y devuelve la señal filtrada en WAV (bytes), la tasa de muestreo y los segmentos.
+    Si se pasa `model`, se reutiliza en lugar de cargar YAMNet de nuevo.
+    Con `compuerta_energia=True` YAMNet solo se ejecuta sobre las zonas no silenciosas.
+    Si se pasa `salida` (de `ejecutar_yamnet` o `salida_compacta`), no se vuelve
+    a ejecutar el modelo.
 
     Retorna:
         audio_filtrado_wav_bytes, sr, segmentos_llanto
     """
-    # Cargar modelo
-    model = cargar_yamnet_model()
+    if salida is None:
+        # Cargar modelo
+        if model is None:
+            model = cargar_yamnet_model()
 
-    # Leer el audio
-    y, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=True)
+        # Leer el audio (WAV, FLAC u OGG) directamente a 16 kHz
+        y, sr = leer_audio_por_bloques(audio_bytes, sr_objetivo=SR_YAMNET)
+        salida = ejecutar_yamnet(y, sr, model, compuerta_energia)
 
     # Obtener segmentos donde hay llanto
-    segmentos, sr = obtener_segmentos_llanto(y, sr, model, threshold)
+    segmentos = segmentos_desde_salida(salida, threshold)
 
     if not segmentos:
         return None
 
+    if "audio" in salida:
+        y, sr = salida["audio"], salida["sr"]
+    else:
+        # Salida compacta: la señal no se guarda, se decodifica de nuevo a 16 kHz
+        y, sr = leer_audio_por_bloques(audio_bytes, sr_objetivo=SR_YAMNET)
+
     # Extraer segmentos
     llanto_segmentos, audio_filtrado = extraer_segmentos(y, segmentos)
 
@@ -0,0 +1,277 @@
+"""
+Prueba de carga concurrente del pipeline de análisis.
+
+Simula N sesiones simultáneas (como varios médicos subiendo archivos a la vez)
+que ejecutan las mismas secciones que app.py sobre grabaciones sintéticas y/o
+reales, y reporta latencia p50/p95/p99, throughput, RSS pico por worker y tasa
+de errores.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.carga_concurrente --sesiones 4 --iteraciones 5
+    python -m benchmarks.carga_concurrente --audios data/ --yamnet hub --json carga.json
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.comun import (
+    generar_llanto_sintetico,
+    a_bytes,
+    buscar_audios,
+    cargar_modelo_yamnet,
+    percentiles,
+)
+
+SECCIONES = ("info_general", "espectrograma", "f0", "jitter_shimmer", "zcr", "yamnet")
+
+
+# ------------------- Secciones (mismas llamadas que app.py) -------------------
+# Las gráficas salen de las mismas funciones `*_completo` de progresivo.py que usa
+# app.py, y YAMNet sigue el mismo camino: salida compacta (lo que la app guarda en
+# caché; aquí cada subida es un archivo nuevo) y filtrado con nueva decodificación.
+
+def _seccion_info_general(audio_bytes, ctx):
+    from audio_processing.librosa_utils import cargar_audio_desde_bytes, calcular_duracion
+
+    y, sr = cargar_audio_desde_bytes(audio_bytes)
+    calcular_duracion(y, sr)
+    np.max(np.abs(y))
+    np.sqrt(np.mean(np.square(y)))
+    np.mean(y)
+    ctx["y"], ctx["sr"] = y, sr
+
+
+def _sonido_praat(audio_bytes, ctx):
+    from audio_processing.praat_utils import cargar_sonido_praat_desde_array
+
+    return cargar_sonido_praat_desde_array(*_audio(audio_bytes, ctx))
+
+
+def _audio(audio_bytes, ctx):
+    from audio_processing.librosa_utils import cargar_audio_desde_bytes
+
+    if "y" not in ctx:
+        ctx["y"], ctx["sr"] = cargar_audio_desde_bytes(audio_bytes)
+    return ctx["y"], ctx["sr"]
+
+
+def _seccion_espectrograma(audio_bytes, ctx):
+    from audio_processing.progresivo import espectrograma_completo
+
+    fig, _ = espectrograma_completo(*_audio(audio_bytes, ctx))
+    fig.to_json()
+
+
+def _seccion_f0(audio_bytes, ctx):
+    from audio_processing.progresivo import f0_completo
+
+    resultado = f0_completo(*_audio(audio_bytes, ctx))
+    if resultado is not None:
+        _, _, _, fig_f0, times_validos, f0_validos = resultado
+        fig_f0.to_json()
+        csv_buffer = io.StringIO()
+        pd.DataFrame({'Tiempo (s)': times_validos, 'F0 (Hz)': f0_validos}).to_csv(csv_buffer, index=False)
+
+
+def _seccion_jitter_shimmer(audio_bytes, ctx):
+    from audio_processing.praat_utils import calcular_jitter_shimmer
+
+    snd = _sonido_praat(audio_bytes, ctx)
+    calcular_jitter_shimmer(snd)
+
+
+def _seccion_zcr(audio_bytes, ctx):
+    from audio_processing.progresivo import zcr_completo
+
+    _, fig_zcr = zcr_completo(*_audio(audio_bytes, ctx))
+    fig_zcr.to_json()
+
+
+def _seccion_yamnet(audio_bytes, ctx):
+    from audio_processing.yamnet_filter import ejecutar_yamnet_desde_bytes, filtrar_llanto_yamnet, embeddings_a_bytes
+
+    salida = ejecutar_yamnet_desde_bytes(audio_bytes, ctx["modelo"], ctx["compuerta_energia"])
+    filtrar_llanto_yamnet(audio_bytes, threshold=ctx["umbral"], salida=salida)
+    embeddings_a_bytes(salida["embeddings"])
+
+
+_FUNCIONES = {
+    "info_general": _seccion_info_general,
+    "espectrograma": _seccion_espectrograma,
+    "f0": _seccion_f0,
+    "jitter_shimmer": _seccion_jitter_shimmer,
+    "zcr": _seccion_zcr,
+    "yamnet": _seccion_yamnet,
+}
+
+
+# ------------------------------ Sesiones ---------------------------------------
+
+def _rss_pico_mb():
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def ejecutar_sesion(id_sesion, grabaciones, iteraciones, secciones, opcion_yamnet, umbral, calentamiento=1,
+                    compuerta_energia=False):
+    """
+    Ejecuta una sesión simulada: procesa `iteraciones` subidas (tomando las
+    grabaciones de forma circular) con todas las secciones indicadas.
+    Las primeras `calentamiento` subidas no se miden (imports, carga del modelo).
+    """
+    modelo = None
+    if "yamnet" in secciones:
+        # Como el st.cache_resource de app.py: un modelo por proceso
+        modelo = cargar_modelo_yamnet(opcion_yamnet)
+
+    registros = []
+    for i in range(calentamiento + iteraciones):
+        nombre, audio_bytes = grabaciones[(id_sesion + i) % len(grabaciones)]
+        ctx = {"modelo": modelo, "umbral": umbral, "compuerta_energia": compuerta_energia}
+        registro = {"sesion": id_sesion, "iteracion": i - calentamiento, "grabacion": nombre,
+                    "inicio": time.time(), "error": None, "secciones": {}}
+        t0 = time.perf_counter()
+        for seccion in secciones:
+            ts = time.perf_counter()
+            try:
+                _FUNCIONES[seccion](audio_bytes, ctx)
+            except Exception as e:
+                registro["error"] = f"{seccion}: {type(e).__name__}: {e}"
+                traceback.print_exc()
+                break
+            finally:
+                registro["secciones"][seccion] = time.perf_counter() - ts
+        registro["latencia"] = time.perf_counter() - t0
+        registro["fin"] = time.time()
+
+        if i >= calentamiento:
+            registros.append(registro)
+
+    return {"sesion": id_sesion, "pid": os.getpid(), "rss_pico_mb": _rss_pico_mb(), "registros": registros}
+
+
+def preparar_grabaciones(rutas, n_sinteticas, duracion, sr):
+    grabaciones = []
+    for i in range(n_sinteticas):
+        y, sr_s = generar_llanto_sintetico(duracion=duracion, sr=sr, semilla=i)
+        grabaciones.append((f"sintetica_{i + 1}", a_bytes(y, sr_s)))
+    for ruta in buscar_audios(rutas):
+        with open(ruta, "rb") as f:
+            grabaciones.append((os.path.basename(ruta), f.read()))
+    return grabaciones
+
+
+def resumir(resultados, duracion_total):
+    registros = [r for res in resultados for r in res["registros"]]
+    latencias = [r["latencia"] for r in registros if r["error"] is None]
+    errores = sum(r["error"] is not None for r in registros)
+
+    if registros:
+        ventana = max(r["fin"] for r in registros) - min(r["inicio"] for r in registros)
+    else:
+        ventana = duracion_total
+
+    resumen = {
+        "subidas": len(registros),
+        "errores": errores,
+        "tasa_error": errores / len(registros) if registros else 0.0,
+        "throughput_subidas_por_s": len(latencias) / ventana if ventana > 0 else 0.0,
+        "latencia_s": percentiles(latencias),
+        "secciones_s": {},
+        "rss_pico_mb_por_worker": {},
+    }
+
+    secciones = {s for r in registros for s in r["secciones"]}
+    for s in SECCIONES:
+        if s in secciones:
+            resumen["secciones_s"][s] = percentiles([r["secciones"][s] for r in registros if s in r["secciones"]])
+
+    # En modo hilos todas las sesiones comparten proceso: se reporta un único pid
+    for res in resultados:
+        pid = str(res["pid"])
+        resumen["rss_pico_mb_por_worker"][pid] = max(resumen["rss_pico_mb_por_worker"].get(pid, 0), res["rss_pico_mb"])
+
+    return resumen
+
+
+def imprimir_resumen(resumen, args):
+    def fmt(p):
+        return " ".join(f"{k}={v:.3f}s" if v is not None else f"{k}=-" for k, v in p.items())
+
+    print(f"\n=== Prueba de carga: {args.sesiones} sesiones ({args.modo}), "
+          f"{args.iteraciones} subidas por sesión, YAMNet={args.yamnet} ===")
+    print(f"Subidas medidas:  {resumen['subidas']}")
+    print(f"Tasa de errores:  {resumen['tasa_error']:.2%} ({resumen['errores']})")
+    print(f"Throughput:       {resumen['throughput_subidas_por_s']:.3f} subidas/s")
+    print(f"Latencia total:   {fmt(resumen['latencia_s'])}")
+    for seccion, p in resumen["secciones_s"].items():
+        print(f"  {seccion:<15} {fmt(p)}")
+    print("RSS pico por worker:")
+    for pid, mb in resumen["rss_pico_mb_por_worker"].items():
+        print(f"  pid {pid}: {mb:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente del análisis de llanto.")
+    parser.add_argument("--sesiones", type=int, default=4, help="Número de sesiones concurrentes (N).")
+    parser.add_argument("--iteraciones", type=int, default=3, help="Subidas medidas por sesión.")
+    parser.add_argument("--calentamiento", type=int, default=1, help="Subidas iniciales no medidas por sesión.")
+    parser.add_argument("--audios", nargs="*", default=[], help="Archivos o carpetas con grabaciones reales.")
+    parser.add_argument("--sinteticas", type=int, default=None,
+                        help="Número de grabaciones sintéticas (por defecto 3 si no hay --audios, si no 0).")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Duración de las grabaciones sintéticas (s).")
+    parser.add_argument("--sr", type=int, default=44100, help="Frecuencia de muestreo de las sintéticas.")
+    parser.add_argument("--secciones", nargs="*", default=list(SECCIONES), choices=SECCIONES)
+    parser.add_argument("--yamnet", default="simulado",
+                        help="'simulado' (modelo local sustituto), 'hub' o ruta a un SavedModel local.")
+    parser.add_argument("--umbral", type=float, default=0.3, help="Umbral de confianza de YAMNet.")
+    parser.add_argument("--compuerta-energia", action="store_true",
+                        help="Ejecutar YAMNet solo sobre las zonas no silenciosas.")
+    parser.add_argument("--modo", choices=("procesos", "hilos"), default="procesos",
+                        help="'procesos': un worker por sesión (RSS por worker). "
+                             "'hilos': todas las sesiones en un proceso, como Streamlit.")
+    parser.add_argument("--json", dest="salida_json", help="Guardar el resumen y los registros en JSON.")
+    args = parser.parse_args(argv)
+
+    n_sinteticas = args.sinteticas if args.sinteticas is not None else (0 if args.audios else 3)
+    grabaciones = preparar_grabaciones(args.audios, n_sinteticas, args.duracion, args.sr)
+    if not grabaciones:
+        parser.error("No hay grabaciones para reproducir.")
+
+    if args.modo == "procesos":
+        executor = ProcessPoolExecutor(max_workers=args.sesiones,
+                                       mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=args.sesiones)
+
+    t0 = time.perf_counter()
+    with executor:
+        futuros = [executor.submit(ejecutar_sesion, i, grabaciones, args.iteraciones, args.secciones,
+                                   args.yamnet, args.umbral, args.calentamiento, args.compuerta_energia)
+                   for i in range(args.sesiones)]
+        resultados = [f.result() for f in futuros]
+    duracion_total = time.perf_counter() - t0
+
+    resumen = resumir(resultados, duracion_total)
+    imprimir_resumen(resumen, args)
+
+    if args.salida_json:
+        with open(args.salida_json, "w") as f:
+            json.dump({"args": vars(args), "resumen": resumen, "resultados": resultados}, f, indent=2)
+
+    return resumen
+
+
+if __name__ == "__main__":
+    main()
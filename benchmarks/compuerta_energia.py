@@ -0,0 +1,98 @@
+"""
+Evalúa la compuerta de energía previa a YAMNet.
+
+Para cada grabación ejecuta YAMNet sobre la señal completa y sobre las
+ventanas no silenciosas, y reporta la fracción de inferencia omitida, el
+tiempo de cada variante y el recall de la compuerta respecto a la
+inferencia completa (frames de 0.48 s con score de llanto sobre el umbral
+que se siguen detectando).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.compuerta_energia --duracion 600 --fraccion-llanto 0.05
+    python -m benchmarks.compuerta_energia --audios data/ --yamnet hub
+"""
+import argparse
+import time
+
+import librosa
+import numpy as np
+
+from audio_processing.yamnet_filter import ejecutar_yamnet
+from benchmarks.comun import generar_llanto_sintetico, buscar_audios, cargar_modelo_yamnet
+
+
+def evaluar(y, sr, model, threshold, umbral_energia, relleno):
+    t0 = time.perf_counter()
+    salida_completa = ejecutar_yamnet(y, sr, model)
+    t_completo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    salida_compuerta = ejecutar_yamnet(y, sr, model, True, umbral_energia, relleno)
+    t_compuerta = time.perf_counter() - t0
+
+    # Comparar frame a frame: ambas salidas están en la misma rejilla de 0.48 s
+    completos = salida_completa["cry_scores"] > threshold
+    compuerta = salida_compuerta["cry_scores"] > threshold
+    frames_llanto = int(completos.sum())
+    frames_perdidos = int((completos & ~compuerta).sum())
+
+    return {
+        "fraccion_omitida": salida_compuerta["estadisticas"]["fraccion_omitida"],
+        "t_completo": t_completo,
+        "t_compuerta": t_compuerta,
+        "frames_llanto": frames_llanto,
+        "frames_perdidos": frames_perdidos,
+        "frames_nuevos": int((compuerta & ~completos).sum()),
+        "recall": 1 - frames_perdidos / frames_llanto if frames_llanto else 1.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compuerta de energía previa a YAMNet: ahorro y recall.")
+    parser.add_argument("--audios", nargs="*", default=[], help="Archivos o carpetas con grabaciones reales.")
+    parser.add_argument("--sinteticas", type=int, default=None,
+                        help="Número de grabaciones sintéticas (por defecto 2 si no hay --audios, si no 0).")
+    parser.add_argument("--duracion", type=float, default=600.0, help="Duración de las sintéticas (s).")
+    parser.add_argument("--fraccion-llanto", type=float, default=0.05,
+                        help="Fracción de llanto en las sintéticas (grabación nocturna: mayormente silencio).")
+    parser.add_argument("--yamnet", default="simulado", help="'simulado', 'hub' o ruta a un SavedModel local.")
+    parser.add_argument("--umbral", type=float, default=0.3, help="Umbral de confianza de YAMNet.")
+    parser.add_argument("--umbral-energia", type=float, default=0.02, help="Umbral RMS de la compuerta.")
+    parser.add_argument("--relleno", type=float, default=0.5, help="Relleno (s) alrededor de cada zona activa.")
+    args = parser.parse_args(argv)
+
+    model = cargar_modelo_yamnet(args.yamnet)
+
+    grabaciones = []
+    n_sinteticas = args.sinteticas if args.sinteticas is not None else (0 if args.audios else 2)
+    for i in range(n_sinteticas):
+        y, sr = generar_llanto_sintetico(args.duracion, sr=16000, semilla=i,
+                                         fraccion_llanto=args.fraccion_llanto)
+        grabaciones.append((f"sintetica_{i + 1}", y, sr))
+    for ruta in buscar_audios(args.audios):
+        y, sr = librosa.load(ruta, sr=None, mono=True)
+        grabaciones.append((ruta, y, sr))
+
+    # Calentamiento (trazado del grafo, descarga del mapa de clases)
+    ejecutar_yamnet(np.zeros(16000, dtype=np.float32), 16000, model)
+
+    print(f"{'grabación':<30} {'omitido':>8} {'t_completo':>11} {'t_compuerta':>12} "
+          f"{'llanto':>7} {'perdidos':>9} {'nuevos':>7} {'recall':>7}")
+    resultados = []
+    for nombre, y, sr in grabaciones:
+        r = evaluar(y, sr, model, args.umbral, args.umbral_energia, args.relleno)
+        resultados.append(r)
+        print(f"{nombre[-30:]:<30} {r['fraccion_omitida']:>8.1%} {r['t_completo']:>10.2f}s "
+              f"{r['t_compuerta']:>11.2f}s {r['frames_llanto']:>7} {r['frames_perdidos']:>9} "
+              f"{r['frames_nuevos']:>7} {r['recall']:>7.3f}")
+
+    if resultados:
+        total_llanto = sum(r["frames_llanto"] for r in resultados)
+        total_perdidos = sum(r["frames_perdidos"] for r in resultados)
+        print(f"\nOmitido medio: {np.mean([r['fraccion_omitida'] for r in resultados]):.1%}  "
+              f"Aceleración: {sum(r['t_completo'] for r in resultados) / max(sum(r['t_compuerta'] for r in resultados), 1e-9):.2f}x  "
+              f"Recall global: {1 - total_perdidos / total_llanto if total_llanto else 1.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import io
+import os
+
+import numpy as np
+import soundfile as sf
+import librosa
+
+
+EXTENSIONES_AUDIO = (".wav", ".flac", ".ogg")
+
+
+def generar_llanto_sintetico(duracion=30.0, sr=44100, semilla=0, fraccion_llanto=0.4):
+    """
+    Genera una señal parecida a un llanto: ráfagas armónicas con F0 entre
+    350 y 550 Hz (con vibrato) separadas por silencios con ruido de fondo.
+    """
+    rng = np.random.default_rng(semilla)
+    n = int(duracion * sr)
+    y = 0.002 * rng.standard_normal(n).astype(np.float32)
+
+    t_actual = rng.uniform(0.2, 1.0)
+    while t_actual < duracion:
+        dur_rafaga = rng.uniform(0.6, 2.5)
+        dur_pausa = dur_rafaga * (1 - fraccion_llanto) / max(fraccion_llanto, 1e-3)
+        inicio = int(t_actual * sr)
+        fin = min(int((t_actual + dur_rafaga) * sr), n)
+        if fin <= inicio:
+            break
+
+        t = np.arange(fin - inicio) / sr
+        f0 = rng.uniform(350, 550) * (1 + 0.03 * np.sin(2 * np.pi * rng.uniform(4, 7) * t))
+        fase = 2 * np.pi * np.cumsum(f0) / sr
+        rafaga = sum(np.sin(k * fase) / k for k in range(1, 6))
+        envolvente = np.sin(np.pi * np.linspace(0, 1, fin - inicio)) ** 0.5
+        y[inicio:fin] += (0.3 * envolvente * rafaga).astype(np.float32)
+
+        t_actual += dur_rafaga + dur_pausa * rng.uniform(0.5, 1.5)
+
+    return np.clip(y, -1.0, 1.0), sr
+
+
+def a_bytes(y, sr, formato="WAV"):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format=formato)
+    return buffer.getvalue()
+
+
+def buscar_audios(rutas):
+    """Expande archivos y carpetas a una lista ordenada de archivos de audio."""
+    encontrados = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, archivos in os.walk(ruta):
+                encontrados += [os.path.join(raiz, a) for a in archivos
+                                if a.lower().endswith(EXTENSIONES_AUDIO)]
+        elif ruta.lower().endswith(EXTENSIONES_AUDIO):
+            encontrados.append(ruta)
+    return sorted(encontrados)
+
+
+class YamnetSimulado:
+    """
+    Sustituto local de YAMNet con la misma interfaz: recibe una onda a 16 kHz y
+    devuelve (scores, embeddings, log_mel) con las formas del modelo real.
+    El score de cada frame depende de su energía, de modo que las ráfagas de
+    llanto sintético superan el umbral. Devuelve arrays de numpy e indica su
+    propio `indice_llanto`, así que no requiere red, TF Hub ni TensorFlow.
+    """
+
+    SR = 16000
+    HOP_PARCHE = 7680        # 0.48 s
+    MUESTRAS_MINIMAS = 15600  # 0.96 s de parche + 0.025 s de ventana - 0.010 s de salto
+    N_CLASES = 521
+    DIM_EMBEDDING = 1024
+    # Mismo índice que obtener_indice_llanto elige con el mapa de clases real ("Crying, sobbing")
+    indice_llanto = 19
+
+    def __init__(self, semilla=0):
+        rng = np.random.default_rng(semilla)
+        self._proyeccion = rng.standard_normal((64, self.DIM_EMBEDDING)).astype(np.float32) / 8
+
+    def __call__(self, waveform):
+        waveform = np.asarray(waveform, dtype=np.float32)
+        n = len(waveform)
+        n_frames = 1 + int(np.ceil(max(0, n - self.MUESTRAS_MINIMAS) / self.HOP_PARCHE))
+        relleno = (n_frames - 1) * self.HOP_PARCHE + self.MUESTRAS_MINIMAS - n
+        if relleno > 0:
+            waveform = np.pad(waveform, (0, relleno))
+
+        # YAMNet enmarca por la ventana de 400 muestras (y rellena la FFT a 512); librosa
+        # enmarca por n_fft y centra la ventana, así que se rellenan 56 muestras por lado
+        # para obtener los mismos frames, 96 + 48 por salto
+        relleno_fft = (512 - 400) // 2
+        mel = librosa.feature.melspectrogram(y=np.pad(waveform, relleno_fft), sr=self.SR, n_fft=512, win_length=400,
+                                             hop_length=160, n_mels=64, fmin=125, fmax=7500,
+                                             center=False)
+        log_mel = np.log(mel.T + 0.001).astype(np.float32)
+
+        # 96 frames de 10 ms por parche, con saltos de 48 frames
+        parches = [log_mel[i * 48:i * 48 + 96] for i in range(n_frames)]
+        medias = np.stack([p.mean(axis=0) for p in parches])
+
+        energia = np.array([np.sqrt(np.mean(np.square(
+            waveform[i * self.HOP_PARCHE:i * self.HOP_PARCHE + 15360]))) for i in range(n_frames)])
+        score = 1 / (1 + np.exp(-(20 * np.log10(energia + 1e-10) + 30) / 3))
+        scores = np.repeat(score[:, None], self.N_CLASES, axis=1).astype(np.float32)
+        embeddings = np.maximum(medias @ self._proyeccion, 0)
+
+        return scores, embeddings, log_mel
+
+
+def cargar_modelo_yamnet(opcion):
+    """`opcion`: 'simulado', 'hub' o la ruta a un SavedModel local de YAMNet."""
+    if opcion == "simulado":
+        return YamnetSimulado()
+
+    from audio_processing.yamnet_filter import cargar_yamnet_model, YAMNET_HANDLE
+    return cargar_yamnet_model(YAMNET_HANDLE if opcion == "hub" else opcion)
+
+
+def percentiles(valores, ps=(50, 95, 99)):
+    if len(valores) == 0:
+        return {f"p{p}": None for p in ps}
+    return {f"p{p}": float(np.percentile(valores, p)) for p in ps}
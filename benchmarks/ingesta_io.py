@@ -0,0 +1,91 @@
+"""
+Benchmark de I/O de la capa de ingesta.
+
+Escribe las mismas grabaciones en WAV, FLAC y OGG, y mide para cada formato:
+tamaño en disco, throughput de decodificación por bloques (a la tasa original
+y resampleando al vuelo a 16 kHz), comparado con librosa.load, y el
+throughput de la transcodificación WAV -> FLAC.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.ingesta_io --duracion 300
+    python -m benchmarks.ingesta_io --audios data/
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import librosa
+import numpy as np
+
+from audio_processing.ingesta import escribir_audio_por_bloques, leer_audio_por_bloques, transcodificar_a_flac
+from benchmarks.comun import generar_llanto_sintetico, buscar_audios
+
+FORMATOS = {"wav": ("WAV", "PCM_16"), "flac": ("FLAC", "PCM_16"), "ogg": ("OGG", "VORBIS")}
+
+
+def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de I/O de la ingesta WAV/FLAC/OGG.")
+    parser.add_argument("--audios", nargs="*", default=[], help="Archivos o carpetas con grabaciones reales.")
+    parser.add_argument("--duracion", type=float, default=300.0, help="Duración de la grabación sintética (s).")
+    parser.add_argument("--sr", type=int, default=44100, help="Frecuencia de muestreo de la sintética.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se reporta el mejor tiempo.")
+    args = parser.parse_args(argv)
+
+    grabaciones = [librosa.load(r, sr=None, mono=True) for r in buscar_audios(args.audios)]
+    if not grabaciones:
+        grabaciones = [generar_llanto_sintetico(args.duracion, sr=args.sr)]
+    duracion_total = sum(len(y) / sr for y, sr in grabaciones)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = {fmt: [] for fmt in FORMATOS}
+        for i, (y, sr) in enumerate(grabaciones):
+            for fmt, (formato, subtipo) in FORMATOS.items():
+                ruta = os.path.join(carpeta, f"audio_{i}.{fmt}")
+                escribir_audio_por_bloques(y, sr, ruta, formato, subtipo)
+                rutas[fmt].append(ruta)
+
+        bytes_wav = sum(os.path.getsize(r) for r in rutas["wav"])
+        print(f"Audio total: {duracion_total:.1f} s en {len(grabaciones)} archivo(s)\n")
+        print(f"{'formato':<8} {'MB':>8} {'vs WAV':>7} {'bloques':>12} {'bloques→16k':>12} "
+              f"{'librosa':>12} {'librosa→16k':>12}   (x tiempo real)")
+
+        for fmt in FORMATOS:
+            bytes_fmt = sum(os.path.getsize(r) for r in rutas[fmt])
+            fila = [f"{fmt:<8} {bytes_fmt / 1e6:>8.2f} {bytes_fmt / bytes_wav:>7.1%}"]
+            variantes = [
+                lambda: [leer_audio_por_bloques(r) for r in rutas[fmt]],
+                lambda: [leer_audio_por_bloques(r, sr_objetivo=16000) for r in rutas[fmt]],
+                lambda: [librosa.load(r, sr=None, mono=True) for r in rutas[fmt]],
+                lambda: [librosa.load(r, sr=16000, mono=True) for r in rutas[fmt]],
+            ]
+            for variante in variantes:
+                t, _ = _medir(variante, args.repeticiones)
+                fila.append(f"{duracion_total / t:>11.0f}x")
+            print(" ".join(fila))
+
+        destinos = [os.path.join(carpeta, f"transcodificado_{i}.flac") for i in range(len(grabaciones))]
+        t, _ = _medir(lambda: [transcodificar_a_flac(o, d) for o, d in zip(rutas["wav"], destinos)],
+                      args.repeticiones)
+        bytes_flac = sum(os.path.getsize(d) for d in destinos)
+        print(f"\nTranscodificación WAV -> FLAC: {bytes_wav / 1e6 / t:.1f} MB/s de WAV, "
+              f"{duracion_total / t:.0f}x tiempo real, tamaño {bytes_flac / bytes_wav:.1%} del WAV")
+
+        # Verificación: FLAC es sin pérdida respecto al WAV de 16 bits
+        for origen, destino in zip(rutas["wav"], destinos):
+            a, _ = leer_audio_por_bloques(origen)
+            b, _ = leer_audio_por_bloques(destino)
+            assert np.array_equal(a, b), f"La transcodificación de {origen} no es sin pérdida"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Verificación de la máquina de estados de la cola de trabajos (reclamo,
+concesiones, reintentos con espera y shards) sobre una base SQLite temporal.
+
+No analiza audio: las filas apuntan a rutas ficticias y los trabajos se
+completan o fallan a mano, salvo en la prueba del worker con shard, cuyo
+shard está vacío.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.verificar_cola
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from audio_processing.cola_trabajos import (
+    conectar,
+    encolar,
+    reclamar,
+    completar,
+    fallar,
+    trabajar,
+)
+
+LEASE_CORTO = 0.05
+
+
+def _nueva_cola(carpeta, n=2):
+    ruta_db = os.path.join(carpeta, "cola.db")
+    encolar(ruta_db, [os.path.join(carpeta, f"grabacion_{i}.wav") for i in range(n)])
+    return ruta_db, conectar(ruta_db)
+
+
+def _fila(con, id_trabajo):
+    return con.execute("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+
+
+def concesion_caducada_se_reclama(carpeta):
+    """Una concesión caducada vuelve a la cola con espera y el intento queda contado."""
+    ruta_db, con = _nueva_cola(carpeta, n=1)
+    fila = reclamar(con, "w1", LEASE_CORTO, max_intentos=3, espera_base_s=30.0)
+    assert fila is not None and _fila(con, fila["id"])["intentos"] == 1
+    time.sleep(2 * LEASE_CORTO)
+
+    # Con espera pendiente no se puede reclamar todavía
+    assert reclamar(con, "w2", 60.0, max_intentos=3, espera_base_s=30.0) is None
+    fila_db = _fila(con, fila["id"])
+    assert fila_db["estado"] == "pendiente", fila_db["estado"]
+    assert fila_db["disponible_desde"] > time.time() + 20
+    assert fila_db["intentos"] == 1
+
+    con.execute("UPDATE trabajos SET disponible_desde = 0")
+    fila = reclamar(con, "w2", 60.0, max_intentos=3, espera_base_s=30.0)
+    assert fila is not None
+    fila_db = _fila(con, fila["id"])
+    assert (fila_db["estado"], fila_db["worker"], fila_db["intentos"]) == ("en_proceso", "w2", 2)
+
+
+def fallido_al_agotar_intentos(carpeta):
+    """Tanto `fallar` como las concesiones caducadas marcan `fallido` al llegar a `max_intentos`."""
+    ruta_db, con = _nueva_cola(carpeta, n=2)
+
+    # Por errores del análisis
+    for intento in range(1, 3):
+        fila = reclamar(con, "w1", 60.0, shard=(1, 2), max_intentos=2, espera_base_s=0.0)
+        assert fila is not None and fila["id"] == 1, f"intento {intento}"
+        fallar(con, fila["id"], "w1", "error de prueba", max_intentos=2, espera_base_s=0.0)
+    assert _fila(con, 1)["estado"] == "fallido"
+
+    # Por concesiones caducadas (worker caído)
+    for intento in range(1, 3):
+        fila = reclamar(con, "w1", LEASE_CORTO, shard=(0, 2), max_intentos=2, espera_base_s=0.0)
+        assert fila is not None and fila["id"] == 2, f"intento {intento}"
+        time.sleep(2 * LEASE_CORTO)
+    assert reclamar(con, "w1", 60.0, max_intentos=2, espera_base_s=0.0) is None
+    fila_db = _fila(con, 2)
+    assert (fila_db["estado"], fila_db["intentos"]) == ("fallido", 2), tuple(fila_db)
+
+
+def worker_con_shard_vacio_termina(carpeta):
+    """Un worker con shard termina cuando su shard está vacío aunque otros shards tengan trabajo."""
+    ruta_db, con = _nueva_cola(carpeta, n=4)
+    con.execute("UPDATE trabajos SET estado = 'completado' WHERE id % 2 = 0")
+
+    resultado = {}
+    hilo = threading.Thread(target=lambda: resultado.update(
+        procesados=trabajar(ruta_db, shard=(0, 2), espera_vacia_s=3600.0)), daemon=True)
+    hilo.start()
+    hilo.join(timeout=30.0)
+    assert not hilo.is_alive(), "el worker sigue esperando trabajos de otro shard"
+    assert resultado["procesados"] == 0
+    assert con.execute("SELECT COUNT(*) FROM trabajos WHERE estado = 'pendiente'").fetchone()[0] == 2
+
+
+def completar_de_worker_obsoleto_no_tiene_efecto(carpeta):
+    """Si otro worker reclamó la fila, el `completar` del worker anterior no la modifica."""
+    ruta_db, con = _nueva_cola(carpeta, n=1)
+    fila = reclamar(con, "obsoleto", LEASE_CORTO, max_intentos=3, espera_base_s=0.0)
+    time.sleep(2 * LEASE_CORTO)
+    fila_nueva = reclamar(con, "actual", 60.0, max_intentos=3, espera_base_s=0.0)
+    assert fila_nueva is not None and fila_nueva["id"] == fila["id"]
+
+    completar(con, fila["id"], "obsoleto", {"origen": "obsoleto"})
+    fila_db = _fila(con, fila["id"])
+    assert (fila_db["estado"], fila_db["worker"], fila_db["resultado"]) == ("en_proceso", "actual", None)
+
+    completar(con, fila["id"], "actual", {"origen": "actual"})
+    assert _fila(con, fila["id"])["estado"] == "completado"
+
+
+VERIFICACIONES = (
+    concesion_caducada_se_reclama,
+    fallido_al_agotar_intentos,
+    worker_con_shard_vacio_termina,
+    completar_de_worker_obsoleto_no_tiene_efecto,
+)
+
+
+def main():
+    fallos = 0
+    for verificacion in VERIFICACIONES:
+        with tempfile.TemporaryDirectory() as carpeta:
+            try:
+                verificacion(carpeta)
+            except Exception:
+                fallos += 1
+                print(f"FALLO  {verificacion.__name__}")
+                traceback.print_exc()
+            else:
+                print(f"ok     {verificacion.__name__}")
+    print(f"\n{len(VERIFICACIONES) - fallos}/{len(VERIFICACIONES)} verificaciones correctas.")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,8 @@ def graficar_espectrograma_praat_interactivo(snd, max_freq=5000, max_points=200_
                             espectrograma=spectrogram_db,
                             tiempo=tiempo,
                             frecuencia=frecuencia)
-        print(f"Datos guardados en: {guardar_como}.npz")
+        if isinstance(guardar_como, str):
+            print(f"Datos guardados en: {guardar_como}.npz")
 
     # Reducir puntos solo para la visualización
     total_points = spectrogram_db.size
@@ -33,7 +34,10 @@ def graficar_espectrograma_praat_interactivo(snd, max_freq=5000, max_points=200_
         tiempo = tiempo[::factor_x]
         frecuencia = frecuencia[::factor_y]
 
-    # Gráfica interactiva
+    return graficar_espectrograma_matriz(spectrogram_db, tiempo, frecuencia, titulo='Praat (Interactivo)')
+
+def graficar_espectrograma_matriz(spectrogram_db, tiempo, frecuencia, titulo='Espectrograma'):
+    """Genera el heatmap interactivo de un espectrograma ya calculado (en dB)."""
     fig = go.Figure(data=go.Heatmap(
         z=spectrogram_db,
         x=tiempo,
@@ -45,7 +49,7 @@ def graficar_espectrograma_praat_interactivo(snd, max_freq=5000, max_points=200_
     ))
 
     fig.update_layout(
-        title='Praat (Interactivo)',
+        title=titulo,
         xaxis_title='Tiempo (s)',
         yaxis_title='Frecuencia (Hz)',
         autosize=True,
@@ -53,6 +57,23 @@ def graficar_espectrograma_praat_interactivo(snd, max_freq=5000, max_points=200_
 
     return fig
 
+def graficar_log_mel_yamnet(log_mel, max_points=200_000):
+    """
+    Muestra el espectrograma log-mel que YAMNet calcula internamente
+    (64 bandas mel HTK entre 125 y 7500 Hz, frames de 10 ms), en dB.
+    """
+    log_mel_db = (20 / np.log(10)) * np.asarray(log_mel, dtype=np.float32).T
+    tiempo = np.arange(log_mel_db.shape[1]) * 0.010
+    frecuencia = librosa.mel_frequencies(n_mels=log_mel_db.shape[0] + 2, fmin=125, fmax=7500, htk=True)[1:-1]
+
+    # Reducir puntos solo en el tiempo (las 64 bandas se mantienen)
+    if log_mel_db.size > max_points:
+        factor_x = int(np.ceil(log_mel_db.size / max_points))
+        log_mel_db = log_mel_db[:, ::factor_x]
+        tiempo = tiempo[::factor_x]
+
+    return graficar_espectrograma_matriz(log_mel_db, tiempo, frecuencia, titulo='Log-mel YAMNet')
+
 def graficar_curva_f0(f0_times, f0_curve, f0_min_valid=200, f0_max_valid=1000):
     """Genera una gráfica interactiva de F0 mostrando solo puntos válidos (250–600 Hz),
     marca los valores mínimo y máximo, y añade líneas guía para el rango típico de llanto."""
@@ -136,6 +157,28 @@ def graficar_curva_f0(f0_times, f0_curve, f0_min_valid=200, f0_max_valid=1000):
     return fig, times_validos, f0_validos
 
 
+def graficar_segmentos_energia(y, sr, segmentos, umbral_db=-30, frame_length=2048, hop_length=512):
+    """Curva de energía (dB) con los segmentos que superan el umbral sombreados."""
+    energia = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+    energia_db = 10 * np.log10(energia + 1e-10)
+    t = librosa.frames_to_time(np.arange(len(energia_db)), sr=sr, hop_length=hop_length)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=t, y=energia_db, mode='lines', name='Energía (dB)', line=dict(color='darkorange')))
+    fig.add_hline(y=umbral_db, line=dict(color='red', dash='dash'), annotation_text='Umbral')
+    for inicio, fin in segmentos:
+        fig.add_vrect(x0=inicio, x1=fin, fillcolor='lightgreen', opacity=0.3, line_width=0)
+
+    fig.update_layout(
+        title=f'Segmentos de energía ({len(segmentos)})',
+        xaxis_title='Tiempo (s)',
+        yaxis_title='Energía (dB)',
+        template='simple_white',
+        height=300
+    )
+    return fig
+
+
 def graficar_zcr_plotly(y, sr, frame_length=2048, hop_length=512):
     zcr = librosa.feature.zero_crossing_rate(y, frame_length=frame_length, hop_length=hop_length)[0]
     frames = range(len(zcr))